@@ -27,6 +27,7 @@ import mathutils
 
 import camera_resolver
 import common
+import scene_state
 import version
 from common import image_is_integer_scale
 from data.animation_name import AnimationName
@@ -66,7 +67,6 @@ removed_objects: List[str] = list()
 render_textures: dict[str, Texture] = dict()
 custom_texture_path_invalid: bool = False
 custom_texture_scale_invalid: bool = False
-custom_texture_reused: bool = False
 
 # Operators
 class ShowRegionUiOperator(bpy.types.Operator):
@@ -91,7 +91,7 @@ class PKXReplaceByAssetsPathOperator(bpy.types.Operator):
 
     @classmethod
     def poll(cls, context):
-        return len(context.scene.custom_texture_path) == 0 or (not custom_texture_path_invalid and not custom_texture_scale_invalid and not custom_texture_reused)
+        return len(context.scene.custom_texture_path) == 0 or (not custom_texture_path_invalid and not custom_texture_scale_invalid)
 
     # noinspection PyMethodMayBeStatic
     def execute(self, context):
@@ -139,9 +139,7 @@ class PKXDeleteOperator(bpy.types.Operator):
 
         objects_to_remove = [obj for obj in objs if "PKXIconGen_" not in obj.name]
         removed_objects.extend([obj.name for obj in objects_to_remove])
-        for obj in objects_to_remove:
-            obj.hide_render = True
-            obj.hide_viewport = True
+        scene_state.current.set_hidden_objects(removed_objects)
 
         return {'FINISHED'}
 
@@ -159,6 +157,7 @@ class PKXResetDeletedOperator(bpy.types.Operator):
     def execute(self, context):
         global removed_objects
         removed_objects = []
+        scene_state.current.set_hidden_objects(removed_objects)
         common.show_armature(get_armature_obj(), True)
 
         return {'FINISHED'}
@@ -506,13 +505,9 @@ def update_mode(self, context):
     else:
         set_show_xd_cutout(self.show_xd_cutout)
 
-    for texture in list(render_textures.values()):
-        common.reset_texture_images(texture)
-
-    common.reset_materials_maps()
-    reset_texture_props(self)
+    reset_texture_props(self)  # Textures are reset by sync_props_to_scene()
 
-    common.switch_model(prd.shiny, mode)
+    scene_state.current.switch_model(prd.shiny, mode)
     sync_prd_to_props(context)
     sync_props_to_scene(context)
 
@@ -533,13 +528,13 @@ def update_animation_name(self, context):
     armature = get_armature_obj()
 
     # While debugging, if an error occurs here, make sure to clear cache between different JSON files
-    armature.animation_data.action = common.get_animation_action(prd.get_mode_model(mode), AnimationName[value])
+    scene_state.current.set_action(armature, common.get_animation_action(prd.get_mode_model(mode), AnimationName[value]))
 
 
 def update_animation_frame(self, context):
     value = self.animation_frame
 
-    context.scene.frame_set(value)
+    scene_state.current.set_frame(context.scene, value)
 
 
 def update_camera_pos(self, context):
@@ -605,29 +600,33 @@ def update_light_distance(self, context):
     light.location[2] = value
 
 
+def update_shiny_color(color: int, channel: ColorChannel, shiny_color: ShinyColors):
+    common.update_shiny_color(color, channel, shiny_color)
+    scene_state.current.invalidate_shiny_colors()
+
 def update_color1_r(self, context):
-    common.update_shiny_color(self.color1_r, ColorChannel.R, ShinyColors.Color1)
+    update_shiny_color(self.color1_r, ColorChannel.R, ShinyColors.Color1)
 def update_color1_g(self, context):
-    common.update_shiny_color(self.color1_g, ColorChannel.G, ShinyColors.Color1)
+    update_shiny_color(self.color1_g, ColorChannel.G, ShinyColors.Color1)
 def update_color1_b(self, context):
-    common.update_shiny_color(self.color1_b, ColorChannel.B, ShinyColors.Color1)
+    update_shiny_color(self.color1_b, ColorChannel.B, ShinyColors.Color1)
 def update_color1_a(self, context):
-    common.update_shiny_color(self.color1_a, ColorChannel.A, ShinyColors.Color1)
+    update_shiny_color(self.color1_a, ColorChannel.A, ShinyColors.Color1)
 
 def update_color2_r(self, context):
-    common.update_shiny_color(self.color2_r, ColorChannel.R, ShinyColors.Color2)
+    update_shiny_color(self.color2_r, ColorChannel.R, ShinyColors.Color2)
 def update_color2_g(self, context):
-    common.update_shiny_color(self.color2_g, ColorChannel.G, ShinyColors.Color2)
+    update_shiny_color(self.color2_g, ColorChannel.G, ShinyColors.Color2)
 def update_color2_b(self, context):
-    common.update_shiny_color(self.color2_b, ColorChannel.B, ShinyColors.Color2)
+    update_shiny_color(self.color2_b, ColorChannel.B, ShinyColors.Color2)
 def update_color2_a(self, context):
-    common.update_shiny_color(self.color2_a, ColorChannel.A, ShinyColors.Color2)
+    update_shiny_color(self.color2_a, ColorChannel.A, ShinyColors.Color2)
 
 
 def update_shading(self, context):
     value = self.shading
 
-    common.update_shading(ObjectShading[value])
+    scene_state.current.set_shading(ObjectShading[value])
 
 
 def update_overlay_image(self, context):
@@ -740,7 +739,6 @@ def update_current_texture_image(self, context):
 def update_custom_texture_path(self, context):
     global custom_texture_path_invalid
     global custom_texture_scale_invalid
-    global custom_texture_reused
 
     texture: Texture = get_texture_obj(self.current_texture_image.name)
     value = self.custom_texture_path
@@ -750,23 +748,19 @@ def update_custom_texture_path(self, context):
         texture_path: str = common.get_absolute_asset_path(value)
         custom_texture_path_invalid = not os.path.isfile(texture_path)
         if not custom_texture_path_invalid:
-            other_textures = list(render_textures.values())
-            other_textures.remove(texture)
-            custom_texture_reused = common.is_custom_texture_used(texture_path, other_textures)
-            if not custom_texture_reused:
-                custom_texture_reused = False
-                common.reset_texture_images(texture)
-                custom_texture_scale_invalid = not common.set_custom_image(original_img, texture_path)
-                if not custom_texture_scale_invalid:
-                    texture.path = value
+            common.reset_texture_images(texture)
+            custom_texture_scale_invalid = not common.set_custom_image(original_img, texture_path)
+            if not custom_texture_scale_invalid:
+                texture.path = value
     else:
         custom_texture_path_invalid = False
         custom_texture_scale_invalid = False
-        custom_texture_reused = False
 
         common.reset_texture_images(texture)
         texture.path = None
 
+    scene_state.current.record_textures(list(render_textures.values()))
+
 
 def update_texture_material(self, context):
     value = self.texture_material
@@ -791,13 +785,11 @@ def update_texture_mapping(self, context):
     if original_img is not None and selected_mat is not None:
         texture: Texture = get_texture_obj(self.current_texture_image.name)
         mat: Optional[Material] = texture.get_material_by_name(self.texture_material.name)
-        custom_img = None
-        if texture.path is not None:
-            custom_img = bpy.data.images.load(filepath=common.get_absolute_asset_path(texture.path), check_existing=True)
 
         mat.map = Vector2(value[0], value[1])
 
-        common.set_material_map(custom_img or original_img, self.texture_material, value[0], value[1])
+        common.set_material_map(original_img, self.texture_material, value[0], value[1])
+        scene_state.current.record_textures(list(render_textures.values()))
 
 
 def get_texture_obj(name: str) -> Texture:
@@ -844,39 +836,35 @@ def sync_camera_to_props(context=None):
     scene.ortho_scale = camera.data.ortho_scale
 
 
+# Only applies what differs from the current scene, see scene_state
 def sync_props_to_scene(context=None):
     scene = context.scene if context is not None else bpy.context.scene
+    state = scene_state.current
     armature = get_armature_obj()
     camera = get_camera()
     camera_focus = get_camera_focus()
     camera_light = get_camera_light()
 
-    camera_light.data.type = scene.light_type
-    camera_light.data.energy = scene.light_strength
-    camera_light.data.color = scene.light_color
-    camera_light.location[2] = scene.light_distance
+    state.switch_model(prd.shiny, mode)
 
-    camera.location = scene.pos
-    camera_focus.location = scene.focus
-    camera.data.type = "ORTHO" if scene.is_ortho else "PERSP"
-    camera.data.angle = radians(scene.fov)
-    camera.data.ortho_scale = scene.ortho_scale
+    state.set_light(camera_light, scene.light_type, scene.light_strength, scene.light_color, scene.light_distance)
 
-    armature.animation_data.action = common.get_animation_action(prd.get_mode_model(mode), AnimationName[scene.animation_name])
-    scene.frame_set(scene.animation_frame)
+    state.set_camera(camera, camera_focus, scene.pos, scene.focus, scene.is_ortho, radians(scene.fov), scene.ortho_scale)
 
-    common.show_armature(armature, True)
-    common.remove_objects(removed_objects)
+    state.set_action(armature, common.get_animation_action(prd.get_mode_model(mode), AnimationName[scene.animation_name]))
+    state.set_frame(scene, scene.animation_frame)
+
+    state.set_hidden_objects(removed_objects)
 
     if prd.shiny.color1 is not None and prd.shiny.color2 is not None:
-        common.update_all_shiny_colors(
+        state.set_shiny_colors(
             ShinyColor(scene.color1_r, scene.color1_g, scene.color1_b, scene.color1_a),
             ShinyColor(scene.color2_r, scene.color2_g, scene.color2_b, scene.color2_a)
         )
 
-    common.set_textures(list(render_textures.values()))
+    state.set_textures(list(render_textures.values()))
 
-    common.update_shading(ObjectShading[scene.shading])
+    state.set_shading(ObjectShading[scene.shading])
 
     update_overlay_from_type(scene.overlay_image_type)
 
@@ -1216,18 +1204,7 @@ def poll_texture_to_link_to(scene, img):
 
 def poll_texture_materials(scene, mat_obj):
     original_img = scene.current_texture_image
-    texture: Texture = get_texture_obj(original_img.name)
-    custom_img = None
-    if texture.path is not None:
-        custom_img = bpy.data.images.load(filepath=common.get_absolute_asset_path(texture.path), check_existing=True)
-
-    if original_img is not None and mat_obj.node_tree is not None:
-        for node in mat_obj.node_tree.nodes:
-            if common.is_node_teximage_with_image(node, original_img) or \
-                    (custom_img is not None and common.is_node_teximage_with_image(node, custom_img)):
-                return True
-
-    return False
+    return original_img is not None and mat_obj.name in common.get_texture_materials(original_img)
 
 
 TEXTURESPROPS = [
@@ -1617,9 +1594,6 @@ class PKXTexturesPanel(PKXPanel, bpy.types.Panel):
                     if custom_texture_scale_invalid:
                         row = image_col.row(align=True)
                         row.label(text="Scale is invalid, texture will not be saved until the scale is an integer scale: 1x, 2x, 3x, etc.", icon="ERROR")
-                    if custom_texture_reused:
-                        row = image_col.row(align=True)
-                        row.label(text="Custom texture cannot be reused due to limitations. Make a copy of the texture and use the copy.", icon="ERROR")
                     row = image_col.row(align=True)
                     row.operator(PKXReplaceByAssetsPathOperator.bl_idname)
                     image_col.separator()
@@ -1766,6 +1740,7 @@ def register(data: PokemonRenderData):
     scene.show_xd_cutout = common.xd_cutout_initial_state
 
     sync_prd_to_props()
+    common.show_armature(get_armature_obj(), True)  # Objects removed before the .blend was last saved are still hidden
     sync_props_to_scene()
 
     # Focus viewport camera on model meshes + camera
@@ -0,0 +1,16 @@
+#!/bin/bash
+
+# Runs the scene sync benchmarks on a copy of the template, template.blend is never modified
+# Arguments:
+#   $1 = Blender executable path
+#   $@ = Optional, benchmark arguments, see scene_sync_benchmark.py (--output, --baseline...)
+
+BLENDER="$1"
+shift
+
+cd "$(dirname "$0")/.." || exit 1
+cp ./template.blend ./benchmarks/benchmark.blend
+"$BLENDER" --background --enable-autoexec --python-exit-code 200 ./benchmarks/benchmark.blend --python ./benchmarks/scene_sync_benchmark.py -- "$@"
+status=$?
+rm -f ./benchmarks/benchmark.blend ./benchmarks/benchmark.blend1
+exit $status
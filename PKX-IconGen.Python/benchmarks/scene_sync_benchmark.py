@@ -0,0 +1,319 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import getopt
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Final, Optional, Callable, Any
+
+import bmesh
+import bpy
+
+sys.path.append(os.getcwd())
+
+from data.animation_name import AnimationName
+from data.box_info import BoxInfo
+from data.camera import Camera
+from data.edit_mode import EditMode
+from data.game import Game
+from data.light import Light
+from data.material import Material
+from data.object_shading import ObjectShading
+from data.pokemon_render_data import PokemonRenderData
+from data.render_data import RenderData
+from data.render_job import RenderJob
+from data.render_profile import RenderProfile
+from data.render_target import RenderTarget
+from data.shiny_color import ShinyColor
+from data.shiny_info import ShinyInfo
+from data.texture import Texture
+from data.vector2 import Vector2
+from data.vector3 import Vector3
+
+import camera_resolver
+import common
+import render
+
+"""
+Times the scene sync hot paths on a generated model, no game assets needed.
+The model is shaped like the importer's output: an armature with a *_Head bone and its parent, skinned meshes with
+image textures going through a Mapping node, and actions named <model>Idle, <model>Faint...
+Each scale factor multiplies the mesh count, the polygons per mesh and the unrelated actions, and is the render scale.
+
+Results are printed and written as JSON with --output. With --baseline, a previous output, the run fails when a
+median got slower than the baseline's by more than --tolerance.
+
+Usage: blender --background template.blend --python benchmarks/scene_sync_benchmark.py -- [--scales 1,2,4] [--meshes N]
+    [--polygons N] [--actions N] [--repeat N] [--render-profile <preset>] [--no-render] [--output <json>] [--baseline <json>] [--tolerance 0.25]
+"""
+
+MODEL_NAME: Final[str] = "pkx_bench"  # Sorted after the unrelated actions, the worst case for a linear search
+ANIMATION_SUFFIXES: Final[list[str]] = ["Idle", "Physical", "Attack", "Damage", "Faint"]
+BASE_TEXTURE_SIZE: Final[int] = 64
+
+
+class BenchmarkOptions(object):
+
+    def __init__(self):
+        self.scales: list[int] = [1, 2, 4]
+        self.meshes: int = 8
+        self.polygons: int = 4096
+        self.actions: int = 200
+        self.repeat: int = 10
+        self.render_profile: str = "draft"
+        self.render: bool = True
+        self.output_path: Optional[str] = None
+        self.baseline_path: Optional[str] = None
+        self.tolerance: float = 0.25
+
+
+def parse_args(script_args: list[str]) -> BenchmarkOptions:
+    options = BenchmarkOptions()
+    opts, _ = getopt.getopt(script_args, "", ["scales=", "meshes=", "polygons=", "actions=", "repeat=", "render-profile=", "no-render", "output=", "baseline=", "tolerance="])
+    for arg, value in opts:
+        if arg == "--scales":
+            options.scales = [int(scale) for scale in value.split(",")]
+        elif arg == "--meshes":
+            options.meshes = int(value)
+        elif arg == "--polygons":
+            options.polygons = int(value)
+        elif arg == "--actions":
+            options.actions = int(value)
+        elif arg == "--repeat":
+            options.repeat = max(1, int(value))
+        elif arg == "--render-profile":
+            options.render_profile = value
+        elif arg == "--no-render":
+            options.render = False
+        elif arg == "--output":
+            options.output_path = os.path.abspath(value)
+        elif arg == "--baseline":
+            options.baseline_path = os.path.abspath(value)
+        elif arg == "--tolerance":
+            options.tolerance = float(value)
+    return options
+
+
+def create_armature():
+    armature = bpy.data.armatures.new(MODEL_NAME)
+    armature_obj = bpy.data.objects.new(MODEL_NAME, armature)
+    bpy.data.scenes["Scene"].collection.objects.link(armature_obj)
+
+    bpy.context.view_layer.objects.active = armature_obj
+    bpy.ops.object.mode_set(mode="EDIT")
+    body_bone = armature.edit_bones.new(f"{MODEL_NAME}_Body")
+    body_bone.head = (0, 0, 0)
+    body_bone.tail = (0, 0, 1)
+    head_bone = armature.edit_bones.new(f"{MODEL_NAME}_Head")
+    head_bone.head = (0, 0, 1)
+    head_bone.tail = (0, 0, 1.5)
+    head_bone.parent = body_bone
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    return armature_obj
+
+
+def create_textured_material(index: int, texture_folder: str) -> tuple[Any, Any, str]:
+    image = bpy.data.images.new(f"{MODEL_NAME}_tex_{index}", BASE_TEXTURE_SIZE, BASE_TEXTURE_SIZE, alpha=True)
+    image.generated_type = "COLOR_GRID"
+
+    # Twice the size, like an upscaled custom texture
+    custom_image = bpy.data.images.new(f"{MODEL_NAME}_custom_{index}", BASE_TEXTURE_SIZE * 2, BASE_TEXTURE_SIZE * 2, alpha=True)
+    custom_image.generated_type = "UV_GRID"
+    custom_path = os.path.join(texture_folder, f"custom_{index}.png")
+    custom_image.filepath_raw = custom_path
+    custom_image.file_format = "PNG"
+    custom_image.save()
+    bpy.data.images.remove(custom_image)
+
+    mat = bpy.data.materials.new(f"{MODEL_NAME}_mat_{index}")
+    mat.use_nodes = True
+    tree = mat.node_tree
+    bsdf = common.get_principled_bsdf_from_tree_nodes(tree)
+    tex_coord = tree.nodes.new("ShaderNodeTexCoord")
+    mapping = tree.nodes.new("ShaderNodeMapping")
+    tex_image = tree.nodes.new("ShaderNodeTexImage")
+    tex_image.image = image
+    tree.links.new(tex_coord.outputs["UV"], mapping.inputs[0])
+    tree.links.new(mapping.outputs[0], tex_image.inputs[0])
+    tree.links.new(tex_image.outputs[0], bsdf.inputs[0])
+
+    return mat, image, custom_path
+
+
+def create_mesh(index: int, armature_obj, side: int, mat):
+    mesh = bpy.data.meshes.new(f"{MODEL_NAME}_mesh_{index}")
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=side, y_segments=side, size=0.5)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.materials.append(mat)
+
+    mesh_obj = bpy.data.objects.new(mesh.name, mesh)
+    bpy.data.scenes["Scene"].collection.objects.link(mesh_obj)
+    mesh_obj.location = (index % 4 - 1.5, 0, 0.25 + index // 4 * 0.5)
+    mesh_obj.parent = armature_obj
+
+    # Every other mesh follows the head, for get_default_camera
+    bone_name = f"{MODEL_NAME}_Head" if index % 2 == 0 else f"{MODEL_NAME}_Body"
+    vertex_group = mesh_obj.vertex_groups.new(name=bone_name)
+    vertex_group.add(range(len(mesh.vertices)), 1.0, "REPLACE")
+    modifier = mesh_obj.modifiers.new("Armature", "ARMATURE")
+    modifier.object = armature_obj
+
+
+def create_actions(armature_obj, unrelated_actions: int):
+    armature_obj.animation_data_create()
+    head_pose_bone = armature_obj.pose.bones[f"{MODEL_NAME}_Head"]
+    head_pose_bone.rotation_mode = "XYZ"
+    for (action_index, suffix) in enumerate(ANIMATION_SUFFIXES):
+        armature_obj.animation_data.action = bpy.data.actions.new(f"{MODEL_NAME}{suffix}")
+        for frame in range(0, 40, 10):
+            head_pose_bone.rotation_euler[0] = (frame + action_index) * 0.01
+            head_pose_bone.keyframe_insert("rotation_euler", frame=frame)
+
+    for i in range(unrelated_actions):
+        bpy.data.actions.new(f"other_{i:05d}{ANIMATION_SUFFIXES[i % len(ANIMATION_SUFFIXES)]}")
+
+    armature_obj.animation_data.action = bpy.data.actions[f"{MODEL_NAME}Idle"]
+
+
+def create_render_data(textures: list[Texture]) -> RenderData:
+    camera = Camera(Vector3(4, -4, 1.5), Vector3(0, 0, 1), True, 40, 4, Light.default(RenderTarget.FACE))
+    return RenderData(AnimationName.IDLE, 10, camera, camera, [], textures, ObjectShading.SMOOTH, None, None)
+
+
+# Loads a generated model like common.import_models does, returns a job rendering it
+def generate_model(options: BenchmarkOptions, scale: int, texture_folder: str) -> RenderJob:
+    common.pre_import_datablocks = common.get_datablock_names()
+
+    armature_obj = create_armature()
+    side = max(1, int((options.polygons * scale) ** 0.5))
+    textures: list[Texture] = []
+    for i in range(options.meshes * scale):
+        mat, image, custom_path = create_textured_material(i, texture_folder)
+        create_mesh(i, armature_obj, side, mat)
+
+        # Half of the textures get a custom image, all of them get a map
+        texture_path = f"{{{{AssetsPath}}}}/{os.path.basename(custom_path)}" if i % 2 == 0 else None
+        textures.append(Texture(image.name, texture_path, [Material(mat.name, Vector2(0.25, 0.5))]))
+    create_actions(armature_obj, options.actions * scale)
+
+    render_data = create_render_data(textures)
+    box = BoxInfo(render_data, render_data, render_data)
+    shiny = ShinyInfo(ShinyColor.default_color1(), ShinyColor.default_color2(), None, render_data, box)
+    prd = PokemonRenderData("Benchmark", None, f"{{{{AssetsPath}}}}/{MODEL_NAME}.pkx", render_data, box, shiny)
+
+    common.normal_armature_name = armature_obj.name
+    common.shiny_armature_name = None
+    common.setup_imported_models(prd)
+
+    output_path = os.path.join(texture_folder, "render.png")
+    return RenderJob(prd, scale, Game.POKEMONCOLOSSEUM, RenderTarget.FACE, *([output_path] * 10))
+
+
+def time_calls(func: Callable[[int], Any], repeat: int) -> dict[str, float]:
+    samples: list[float] = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+
+    return {"min": min(samples), "median": statistics.median(samples), "max": max(samples)}
+
+
+def run_scale(options: BenchmarkOptions, scale: int) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="pkx-bench-") as texture_folder:
+        common.assets_path = texture_folder
+        job = generate_model(options, scale, texture_folder)
+        prd = job.data
+        textures = prd.face.textures
+        images = [bpy.data.images[texture.name] for texture in textures]
+        try:
+            results["update_shading"] = time_calls(lambda i: common.update_shading(ObjectShading(i % 2)), options.repeat)
+            results["update_shading_unchanged"] = time_calls(lambda i: common.update_shading(ObjectShading.SMOOTH), options.repeat)
+            results["get_animation_action"] = time_calls(lambda i: common.get_animation_action(prd.model, AnimationName(i % len(AnimationName))), options.repeat)
+
+            def get_all_image_nodes(_: int):
+                for image in images:
+                    common.get_image_nodes(image)
+                    common.get_texture_materials(image)
+            results["get_image_nodes"] = time_calls(get_all_image_nodes, options.repeat)
+
+            def set_and_reset_textures(_: int):
+                common.set_textures(textures)
+                for texture in textures:
+                    common.reset_texture_images(texture)
+                common.reset_materials_maps()
+            results["set_textures"] = time_calls(set_and_reset_textures, options.repeat)
+
+            # noinspection PyBroadException
+            try:
+                results["get_default_camera"] = time_calls(lambda i: camera_resolver.get_default_camera(RenderTarget.FACE, EditMode.FACE_NORMAL, prd), options.repeat)
+            except Exception as e:
+                print(f"Skipping get_default_camera, needs a 3D view: {e}")
+
+            if options.render:
+                render.apply_render_profile(RenderProfile.get_preset(options.render_profile))
+                try:
+                    results["render_job_mode"] = time_calls(lambda i: render.render_job_mode(job, job.face_main_path, EditMode.FACE_NORMAL), max(1, options.repeat // 5))
+                finally:
+                    render.apply_render_profile(None)
+                    render.reset_job()
+        finally:
+            common.unload_models()
+
+    return results
+
+
+def find_regressions(results: dict[str, dict[str, dict[str, float]]], baseline: dict[str, dict[str, dict[str, float]]], tolerance: float) -> list[str]:
+    regressions: list[str] = []
+    for (scale, functions) in results.items():
+        for (function, timings) in functions.items():
+            baseline_timings = baseline.get(scale, {}).get(function)
+            if baseline_timings is not None and timings["median"] > baseline_timings["median"] * (1 + tolerance):
+                regressions.append(f"{function} at scale {scale}: {timings['median'] * 1000:.3f} ms, was {baseline_timings['median'] * 1000:.3f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    benchmark_options = parse_args(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
+
+    # Scale -> function -> min/median/max seconds
+    all_results: dict[str, dict[str, dict[str, float]]] = {}
+    for benchmark_scale in benchmark_options.scales:
+        print(f"Scale {benchmark_scale}: {benchmark_options.meshes * benchmark_scale} meshes, {benchmark_options.polygons * benchmark_scale} polygons per mesh")
+        all_results[str(benchmark_scale)] = run_scale(benchmark_options, benchmark_scale)
+        for (function_name, function_timings) in all_results[str(benchmark_scale)].items():
+            print(f"    {function_name:<26} median {function_timings['median'] * 1000:10.3f} ms    min {function_timings['min'] * 1000:10.3f} ms    max {function_timings['max'] * 1000:10.3f} ms")
+
+    if benchmark_options.output_path is not None:
+        with open(benchmark_options.output_path, "w") as output_file:
+            json.dump(all_results, output_file, indent=2)
+
+    if benchmark_options.baseline_path is not None:
+        with open(benchmark_options.baseline_path, "r") as baseline_file:
+            found_regressions = find_regressions(all_results, json.load(baseline_file), benchmark_options.tolerance)
+        for regression in found_regressions:
+            print(f"Slower than baseline: {regression}")
+        sys.exit(1 if len(found_regressions) > 0 else 0)
@@ -17,19 +17,26 @@
 """
 
 import getopt
+import json
 import os
 import sys
 from pathlib import Path
 
 import bpy
+import numpy as np
 from typing import List, Optional, Final, Any
 
 import blender_compat
+import image_probe
+import model_cache
+import texture_cache
+import visibility
 from data.animation_name import AnimationName
 from patcher import apply_patches_by_model_name
 from data.edit_mode import EditMode
 from data.object_shading import ObjectShading
 from data.pokemon_render_data import PokemonRenderData
+from data.render_profile import RenderProfile, PRESETS as RENDER_PROFILE_PRESETS
 from data.shiny_color import ColorChannel, ShinyColors, ShinyColor
 from data.shiny_info import ShinyInfo
 from data.texture import Texture
@@ -46,14 +53,40 @@ class PkxIconGenCache(object):
         self.img_mat_mapping: Final[dict[str, list[tuple[str, bpy.types.ShaderNode, list[float]]]]] = {}
         # TexImage by Blender materials
         self.mat_tex_image: Final[dict[str, list]] = {}
-        # TexImage by Blender images
+        # TexImage by Blender images, follows texture swaps
         self.img_tex_image: Final[dict[str, list]] = {}
+        # Material name by TexImage pointer
+        self.node_mats: Final[dict[int, str]] = {}
+        # Custom texture path, downsample factor and the TexImage swapped to it by original Blender images, one custom texture can be bound to several
+        self.custom_bindings: Final[dict[str, tuple[str, int, list]]] = {}
         # Name of materials that have been modified after getting imported
         self.processed_mats: Final[list[str]] = []
+        # Last shading applied by Blender mesh
+        self.mesh_shading: Final[dict[str, ObjectShading]] = {}
+        # Action by model stem and animation, None when the model has no such animation
+        self.animation_actions: Final[dict[tuple[str, AnimationName], Optional[bpy.types.Action]]] = {}
+        # Action count when the index was last built, adding or removing actions rebuilds it
+        self.animation_actions_count: int = -1
 
     def init_mat_cache(self, mat_name: str):
         self.mat_tex_image[mat_name] = []
 
+    def add_image_node(self, tex_node: bpy.types.ShaderNode, mat: bpy.types.Material):
+        if tex_node.image is None:
+            return
+
+        self.img_tex_image.setdefault(tex_node.image.name, []).append(tex_node)
+        self.node_mats[tex_node.as_pointer()] = mat.name
+
+    # Nodes of from_name now use to_name
+    def move_image_nodes(self, from_name: str, to_name: str, nodes: list):
+        if from_name == to_name:
+            return
+
+        moved: set[int] = set([node.as_pointer() for node in nodes])
+        self.img_tex_image[from_name] = [node for node in self.img_tex_image.get(from_name, []) if node.as_pointer() not in moved]
+        self.img_tex_image.setdefault(to_name, []).extend(nodes)
+
     def add_mat_mapping(self, tex_node: bpy.types.ShaderNode, mat: bpy.types.Material):
         if tex_node.bl_idname != "ShaderNodeTexImage":
             print(f"Tried using {tex_node.bl_idname} to add to Mat/Mapping cache")
@@ -80,12 +113,41 @@ SHINYCOLOR1_NAME: Final[str] = "PKX_ShinyColor1"
 SHINYCOLOR2_NAME: Final[str] = "PKX_ShinyColor2"
 SHINYMIXNODE_NAME: Final[str] = "PKX_ShinyMixRGB"
 
+# Imported action names end with these
+ANIMATION_SUFFIXES: Final[dict[AnimationName, str]] = {
+    AnimationName.IDLE: "Idle",
+    AnimationName.PHYSICAL_ATTACK: "Physical",
+    AnimationName.SPECIAL_ATTACK: "Attack",
+    AnimationName.TAKING_DAMAGE: "Damage",
+    AnimationName.FAINTING: "Faint"
+}
+
 cmd_args = None
 debugging = False
 assets_path: Optional[str] = None
 xd_cutout_initial_state: bool = False
 do_print_verbose: bool = False
+worker_mode: bool = False
+incremental: bool = False
+render_strategy: str = "still"  # "still" renders modes one by one, "animation" renders modes sharing unkeyable state as frames of one animation
+memory_output: Optional[str] = None  # Keep renders in memory and write them at the end of a job, see render_capture
+frame_buffer_path: Optional[str] = None  # Hand renders to the host through a memory-mapped ring buffer, see frame_buffer
+render_profile_preset: Optional[str] = None  # Render profile preset of jobs without their own render_profile
+auto_border: bool = False  # Only render the region covered by the model, see render_border
+profile_path: Optional[str] = None  # Folder receiving a cProfile capture per job, see profiling
+memory_profiling: bool = False  # Emit memory use per job phase, see memory_profile
+downsample_textures: bool = False  # Bind custom textures downsampled to the render scale, see texture_cache
+model_cache_path: Optional[str] = None  # Folder of imported models appended instead of imported again, see model_cache
 pkx_cache = PkxIconGenCache()
+# Filled use_smooth values, by value, sliced to the polygon count of each mesh
+shading_buffers: dict[bool, np.ndarray] = {}
+
+# Object names of the armatures of the currently loaded models
+normal_armature_name: Optional[str] = None
+shiny_armature_name: Optional[str] = None
+# Datablock names present before the current models were imported, by bpy.data collection
+MODEL_DATA_COLLECTIONS: Final[list[str]] = ["objects", "armatures", "meshes", "materials", "images", "actions", "node_groups", "collections"]
+pre_import_datablocks: Optional[dict[str, set[str]]] = None
 
 def attach_debugger(debug_egg: str):
     global debugging
@@ -109,9 +171,20 @@ def parse_cmd_args(script_args):
     global assets_path
     global xd_cutout_initial_state
     global do_print_verbose
+    global worker_mode
+    global incremental
+    global render_strategy
+    global memory_output
+    global frame_buffer_path
+    global render_profile_preset
+    global auto_border
+    global profile_path
+    global memory_profiling
+    global downsample_textures
+    global model_cache_path
 
     if cmd_args is None:
-        cmd_args, _ = getopt.getopt(script_args, "", ["pkx-debug=", "debug-egg=", "assets-path=", "xd-cutout", "verbose"])
+        cmd_args, _ = getopt.getopt(script_args, "", ["pkx-debug=", "debug-egg=", "assets-path=", "xd-cutout", "verbose", "worker", "manifest=", "socket=", "incremental", "render-strategy=", "memory-output=", "frame-buffer=", "render-profile=", "auto-border", "profile=", "memory-profile", "texture-cache-mb=", "downsample-textures", "model-cache="])
         for arg, value in cmd_args:
             if arg == "--assets-path" and value != "":
                 assets_path = value
@@ -120,11 +193,55 @@ def parse_cmd_args(script_args):
                 xd_cutout_initial_state = True
             elif arg == "--verbose":
                 do_print_verbose = True
+            elif arg == "--worker":
+                worker_mode = True
+            elif arg == "--incremental":
+                incremental = True
+            elif arg == "--render-strategy":
+                if value not in ["still", "animation"]:
+                    raise Exception(f"Unknown render strategy: {value}")
+                render_strategy = value
+            elif arg == "--memory-output":
+                if value not in ["png", "raw"]:
+                    raise Exception(f"Unknown memory output format: {value}")
+                memory_output = value
+            elif arg == "--frame-buffer" and value != "":
+                frame_buffer_path = os.path.abspath(value)
+            elif arg == "--render-profile" and value != "":
+                if value not in RENDER_PROFILE_PRESETS:
+                    raise Exception(f"Unknown render profile preset: {value}")
+                render_profile_preset = value
+            elif arg == "--auto-border":
+                auto_border = True
+            elif arg == "--profile" and value != "":
+                profile_path = os.path.abspath(value)
+                os.makedirs(profile_path, exist_ok=True)
+            elif arg == "--memory-profile":
+                memory_profiling = True
+            elif arg == "--texture-cache-mb" and value != "":
+                texture_cache.current.budget_bytes = int(float(value) * 1024 * 1024)
+            elif arg == "--downsample-textures":
+                downsample_textures = True
+            elif arg == "--model-cache" and value != "":
+                model_cache_path = os.path.abspath(value)
+                os.makedirs(model_cache_path, exist_ok=True)
+
+# Profile of a job, or the --render-profile preset when the job has none
+def get_render_profile(job_profile: Optional[RenderProfile]) -> Optional[RenderProfile]:
+    if job_profile is None and render_profile_preset is not None:
+        return RenderProfile.get_preset(render_profile_preset)
+    return job_profile
 
 def print_verbose(msg: str):
     if do_print_verbose:
         print(msg)
 
+# Machine-readable output, one JSON object per line, to be picked out of Blender's own output
+def emit_record(record_type: str, **fields):
+    record: dict[str, Any] = {"pkx_record": record_type}
+    record.update(fields)
+    print(json.dumps(record, separators=(',', ':')), flush=True)
+
 def get_absolute_asset_path(model: str) -> str:
     return model.replace("{{AssetsPath}}", assets_path)
 
@@ -132,18 +249,30 @@ def get_absolute_asset_path(model: str) -> str:
 def get_relative_asset_path(model: str) -> str:
     return model.replace("{{AssetsPath}}/", "")
 
-def import_model(model_idx: int, model_path: str):
+def get_true_model_path(model_path: str) -> str:
+    if assets_path is not None:
+        return get_absolute_asset_path(model_path)
+    return model_path
+
+
+def import_model(model_path: str) -> str:
     objs = bpy.data.objects
+    existing_armatures: set[str] = set(bpy.data.armatures.keys())
 
-    if assets_path is not None:
-        true_path = get_absolute_asset_path(model_path)
-    else:
-        true_path = model_path
+    true_path = get_true_model_path(model_path)
 
-    print(f"Importing: {true_path}")
     model_bytes: bytes
     with open(true_path, 'rb') as f:
         model_bytes = f.read()
+
+    model_key: Optional[str] = None
+    if model_cache_path is not None:
+        model_key = model_cache.get_model_key(model_bytes)
+        cached_armature = append_cached_model(true_path, model_key)
+        if cached_armature is not None:
+            return cached_armature.name
+
+    print(f"Importing: {true_path}")
     options = {
         "ik_hack": True,
         "verbose": False, #do_print_verbose
@@ -159,31 +288,110 @@ def import_model(model_idx: int, model_path: str):
     logger = Logger(False, model_name)
     Importer.run(bpy.context, model_bytes, model_name, options, logger)
 
-    armature = objs[bpy.data.armatures[model_idx].name] # While debugging, if an error occurs here, make sure to clear cache between different JSON files
+    new_armatures = [armature for armature in bpy.data.armatures if armature.name not in existing_armatures]
+    if len(new_armatures) == 0:
+        raise Exception(f"No armature was imported from {true_path}.")
+
+    armature = objs[new_armatures[0].name] # While debugging, if an error occurs here, make sure to clear cache between different JSON files
+    armature.hide_select = True
+    armature.hide_viewport = True
+
+    if model_key is not None:
+        armature[model_cache.KEY_PROPERTY] = model_key
+        # noinspection PyBroadException
+        try:
+            model_cache.write_entry(model_cache_path, true_path, model_key, armature, get_model_actions(model_path))
+        except Exception as e:
+            print(f"Could not cache imported model {true_path}: {e}")
+    return armature.name
+
+
+# Armature object of the model appended from the model cache, None when it has no entry for the key
+def append_cached_model(true_path: str, model_key: str):
+    entry_path = model_cache.get_entry_path(model_cache_path, true_path, model_key)
+    if not os.path.isfile(entry_path):
+        return None
+
+    print(f"Appending cached model: {entry_path}")
+    # noinspection PyBroadException
+    try:
+        armature = model_cache.load_entry(entry_path)
+    except Exception as e:
+        print(f"Cached model could not be appended, importing instead: {e}")
+        return None
+    if armature is None:
+        print("Cached model has no armature, importing instead.")
+        return None
+
     armature.hide_select = True
     armature.hide_viewport = True
+    return armature
 
 
-def import_models(prd: PokemonRenderData):
+# Armature kept in the template copy by a previous run for the same model key
+def find_kept_armature(model_path: str, ignored_name: Optional[str] = None) -> Optional[str]:
+    model_key = model_cache.get_file_key(get_true_model_path(model_path))
+    for obj in bpy.data.objects:
+        if obj.type == "ARMATURE" and obj.name != ignored_name and model_cache.get_armature_key(obj) == model_key:
+            return obj.name
+    return None
+
+
+# Removes armatures kept in the template copy that are not kept_names, they come from other model bytes, importer or patches
+def remove_stale_armatures(kept_names: List[Optional[str]]):
+    stale_names = [obj.name for obj in bpy.data.objects if obj.type == "ARMATURE" and obj.name not in kept_names]
+    if len(stale_names) > 0:
+        print(f"Removing stale imported models: {', '.join(stale_names)}")
+        bpy.data.batch_remove(ids=get_armature_datablocks(stale_names))
+
+
+def import_models(prd: PokemonRenderData, save_blend: bool = True):
+    global normal_armature_name
+    global shiny_armature_name
+    global pre_import_datablocks
     armatures = bpy.data.armatures
     normal_imported: bool = False
     shiny_imported: bool = False
 
     shiny_info: ShinyInfo = prd.shiny
 
-    if len(armatures) == 0:
-        import_model(0, prd.model)
+    # Models already imported by a previous run, kept in the template copy
+    if normal_armature_name is None and len(armatures) > 0 and model_cache_path is not None:
+        # Only the ones imported from the same model bytes, importer and patches are still valid
+        normal_armature_name = find_kept_armature(prd.model)
+        if shiny_info.model is not None:
+            shiny_armature_name = find_kept_armature(shiny_info.model, normal_armature_name)
+        remove_stale_armatures([normal_armature_name, shiny_armature_name])
+        if normal_armature_name is None and shiny_armature_name is None:
+            pre_import_datablocks = get_datablock_names()
+    elif normal_armature_name is None and len(armatures) > 0:
+        normal_armature_name = armatures[0].name
+        if len(armatures) > 1 and shiny_info.model is not None:
+            shiny_armature_name = armatures[1].name
+    elif normal_armature_name is None:
+        pre_import_datablocks = get_datablock_names()
+
+    if normal_armature_name is None:
+        normal_armature_name = import_model(prd.model)
         normal_imported = True
 
-    if len(armatures) == 1 and shiny_info.model is not None:
-        import_model(1, shiny_info.model)
+    if shiny_armature_name is None and shiny_info.model is not None:
+        shiny_armature_name = import_model(shiny_info.model)
 
         switch_model(shiny_info, EditMode.FACE_NORMAL)  # Hide shiny model on load
         shiny_imported = True
 
-    if normal_imported or shiny_imported:
-        bpy.ops.wm.save_mainfile()
-    bpy.ops.wm.save_as_mainfile(filepath=os.path.join(os.path.dirname(bpy.data.filepath), "edit.blend"))
+    if save_blend:
+        if normal_imported or shiny_imported:
+            bpy.ops.wm.save_mainfile()
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.join(os.path.dirname(bpy.data.filepath), "edit.blend"))
+
+    setup_imported_models(prd)
+
+
+# Prepares the materials of the loaded models and fills the cache, the armatures must be set first
+def setup_imported_models(prd: PokemonRenderData):
+    shiny_info: ShinyInfo = prd.shiny
 
     # Remove material animations
     for mat in bpy.data.materials:
@@ -218,6 +426,7 @@ def import_models(prd: PokemonRenderData):
             for node in tree.nodes:
                 if node.bl_idname == "ShaderNodeTexImage":
                     pkx_cache.mat_tex_image[mat.name].append(node)
+                    pkx_cache.add_image_node(node, mat)
                     pkx_cache.add_mat_mapping(node, mat)
                 elif SHINYCOLOR1_NAME in node.name:
                     pkx_cache.shiny_color1.append(node)
@@ -229,6 +438,85 @@ def import_models(prd: PokemonRenderData):
     if shiny_info.color1 is not None and shiny_info.color2 is not None:
         update_all_shiny_colors(shiny_info.color1, shiny_info.color2)
 
+    index_animation_actions([model for model in [prd.model, shiny_info.model] if model is not None and model != ""], True)
+
+
+def get_datablock_names() -> dict[str, set[str]]:
+    return {collection_name: set(getattr(bpy.data, collection_name).keys()) for collection_name in MODEL_DATA_COLLECTIONS}
+
+
+# Removes everything added to the file since the current models were imported: the models themselves and any texture loaded for them
+def unload_models():
+    global normal_armature_name
+    global shiny_armature_name
+    global pre_import_datablocks
+    global pkx_cache
+
+    texture_cache.current.remove_all()  # Custom textures are only bound to the models
+    if pre_import_datablocks is None:
+        # Models came with the .blend, only what hangs off the armatures is known to be theirs
+        removed_ids = get_armature_datablocks([name for name in [normal_armature_name, shiny_armature_name] if name is not None])
+    else:
+        removed_ids = []
+        for collection_name in MODEL_DATA_COLLECTIONS:
+            for datablock in getattr(bpy.data, collection_name):
+                if datablock.name not in pre_import_datablocks[collection_name] and not is_render_image(datablock):
+                    removed_ids.append(datablock)
+
+    print(f"Unloading {len(removed_ids)} datablocks")
+    bpy.data.batch_remove(ids=removed_ids)
+
+    normal_armature_name = None
+    shiny_armature_name = None
+    pre_import_datablocks = None
+    pkx_cache = PkxIconGenCache()
+    visibility.manager.clear()
+
+
+def get_armature_datablocks(armature_names: List[str]) -> list:
+    datablocks: set = set()
+    for armature_name in armature_names:
+        armature_obj = bpy.data.objects[armature_name]
+        datablocks.add(armature_obj)
+        datablocks.add(armature_obj.data)
+        if armature_obj.animation_data is not None and armature_obj.animation_data.action is not None:
+            datablocks.add(armature_obj.animation_data.action)
+
+        for child in armature_obj.children:
+            datablocks.add(child)
+            if child.data is not None:
+                datablocks.add(child.data)
+            for slot in child.material_slots:
+                if slot.material is not None:
+                    datablocks.add(slot.material)
+                    if slot.material.node_tree is not None:
+                        for node in slot.material.node_tree.nodes:
+                            if node.bl_idname == "ShaderNodeTexImage" and node.image is not None:
+                                datablocks.add(node.image)
+    return list(datablocks)
+
+
+def is_render_image(datablock) -> bool:
+    return isinstance(datablock, bpy.types.Image) and datablock.type in {"RENDER_RESULT", "COMPOSITING"}
+
+
+def get_normal_armature_obj():
+    return bpy.data.objects[normal_armature_name]
+
+
+def get_shiny_armature_obj():
+    if shiny_armature_name is None:
+        return None
+    return bpy.data.objects[shiny_armature_name]
+
+
+def get_loaded_armature_objs() -> list:
+    armature_objs = [get_normal_armature_obj()]
+    shiny_armature_obj = get_shiny_armature_obj()
+    if shiny_armature_obj is not None:
+        armature_objs.append(shiny_armature_obj)
+    return armature_objs
+
 
 def setup_shiny_mats(tree: bpy.types.NodeTree):
     uses_bump: bool = tree.nodes.find("Bump") != -1
@@ -345,46 +633,93 @@ def switch_model(shiny_info: ShinyInfo, mode: EditMode):
         else:
             hide_shiny_mats()
     elif shiny_info.model is not None:
-        objs = bpy.data.objects
-
         show_shiny = mode in EditMode.ANY_SHINY
-        show_armature(objs[bpy.data.armatures[0].name], not show_shiny)
-        show_armature(objs[bpy.data.armatures[1].name], show_shiny)
+        show_armature(get_normal_armature_obj(), not show_shiny)
+        show_armature(get_shiny_armature_obj(), show_shiny)
     else:
         raise Exception("PRD had no filter or alt model.")
 
 
 def get_image_nodes(image_obj):
     if image_obj.name not in pkx_cache.img_tex_image:
-        nodes: list = list()
-        if image_obj is not None:
-            for mat in bpy.data.materials:
-                if mat.node_tree is not None:
-                    for node in mat.node_tree.nodes:
-                        if is_node_teximage_with_image(node, image_obj):
-                            nodes.append(node)
-        pkx_cache.img_tex_image[image_obj.name] = nodes
+        # Not used by the models when they were imported, only a material changed some other way could use it
+        pkx_cache.img_tex_image[image_obj.name] = []
+        for mat in bpy.data.materials:
+            if mat.node_tree is not None:
+                for node in mat.node_tree.nodes:
+                    if is_node_teximage_with_image(node, image_obj):
+                        pkx_cache.add_image_node(node, mat)
 
     return pkx_cache.img_tex_image[image_obj.name]
 
 
-def set_custom_image(image_obj, texture_path: str) -> bool:
+# TexImage of an original image, wherever a custom texture bound to it is
+def get_texture_nodes(original_img) -> list:
+    binding = pkx_cache.custom_bindings.get(original_img.name)
+    return binding[2] if binding is not None else get_image_nodes(original_img)
+
+
+# Name of the materials using an original image, used by the material search
+def get_texture_materials(original_img) -> set[str]:
+    return set([pkx_cache.node_mats[node.as_pointer()] for node in get_texture_nodes(original_img)])
+
+
+# With render_scale and --downsample-textures, binds a copy downsampled to the smallest integer multiple of the original at least render_scale times its size
+def set_custom_image(image_obj, texture_path: str, render_scale: Optional[int] = None) -> bool:
     success: bool = False
 
-    nodes = get_image_nodes(image_obj)
-    new_img = bpy.data.images.load(filepath=texture_path, check_existing=True)
+    reset_custom_image(image_obj)
+    # Rejects from the header when possible, an invalid texture never gets loaded
+    probed_size = image_probe.get_image_size(texture_path)
+    if probed_size is not None and not is_integer_scale(tuple(image_obj.size), probed_size):
+        return success
+
+    factor: int = 1
+    if downsample_textures and render_scale is not None:
+        custom_size = probed_size or tuple(texture_cache.current.get(texture_path).size)
+        factor = texture_cache.get_downsample_factor(tuple(image_obj.size), custom_size, render_scale)
+
+    nodes = list(get_image_nodes(image_obj))
+    new_img = texture_cache.current.acquire(texture_path, factor)
     if image_is_integer_scale(image_obj, new_img):
         success = True
         for node in nodes:
             node.image = new_img
+        pkx_cache.move_image_nodes(image_obj.name, new_img.name, nodes)
+        pkx_cache.custom_bindings[image_obj.name] = (texture_path, factor, nodes)
+    else:
+        texture_cache.current.release(texture_path, factor)
+        texture_cache.current.discard(texture_path, factor)
     return success
 
 
+# Puts back the original image where it was bound to a custom texture, other images bound to the same one are left as is
+def reset_custom_image(original_img):
+    binding = pkx_cache.custom_bindings.pop(original_img.name, None)
+    if binding is None:
+        return
+
+    (texture_path, factor, nodes) = binding
+    custom_img = texture_cache.current.find(texture_path, factor)
+    for node in nodes:
+        node.image = original_img
+    if custom_img is not None:
+        pkx_cache.move_image_nodes(custom_img.name, original_img.name, nodes)
+    texture_cache.current.release(texture_path, factor)
+
+
 def image_is_integer_scale(original_img, new_img) -> bool:
-    o_width: int = original_img.size[0]
-    o_height: int = original_img.size[1]
-    n_width: int = new_img.size[0]
-    n_height: int = new_img.size[1]
+    return is_integer_scale(tuple(original_img.size), tuple(new_img.size))
+
+
+def is_integer_scale(original_size: tuple[int, int], new_size: tuple[int, int]) -> bool:
+    o_width: int = original_size[0]
+    o_height: int = original_size[1]
+    n_width: int = new_size[0]
+    n_height: int = new_size[1]
+
+    if o_width == 0 or o_height == 0 or n_width == 0 or n_height == 0:
+        return False
 
     width_scale_check: bool = n_width % o_width == 0
     height_scale_check: bool = n_height % o_height == 0
@@ -393,25 +728,22 @@ def image_is_integer_scale(original_img, new_img) -> bool:
     return width_scale_check and height_scale_check and ratio_check
 
 
-def set_textures(textures: List[Texture]):
+def set_textures(textures: List[Texture], render_scale: Optional[int] = None):
     for texture in textures:
         if bpy.data.images.find(texture.name) == -1:
             print("Image not found, ignoring. [%s]" % texture.name)
             if texture.path is not None:
                 full_path: str = get_absolute_asset_path(texture.path)
-                unlinked_img = bpy.data.images.load(filepath=full_path, check_existing=True)
+                unlinked_img = texture_cache.current.get(full_path)
                 unlinked_img.name = "UNLINKED_" + texture.name
             continue
 
-        custom_img = None
+        original_img = bpy.data.images[texture.name]
         if texture.path is not None:
-            full_path: str = get_absolute_asset_path(texture.path)
-            set_custom_image(bpy.data.images[texture.name], full_path)
-            custom_img = bpy.data.images.load(filepath=full_path, check_existing=True)
+            set_custom_image(original_img, get_absolute_asset_path(texture.path), render_scale)
 
-        original_img = bpy.data.images[texture.name]
         for mat in texture.mats:
-            set_material_map(custom_img or original_img,
+            set_material_map(original_img,
                              bpy.data.materials[mat.name],
                              mat.map.x,
                              mat.map.y)
@@ -419,35 +751,23 @@ def set_textures(textures: List[Texture]):
 
 def reset_texture_images(texture: Texture):
     if texture.path is not None:
-        custom_img = bpy.data.images.load(filepath=get_absolute_asset_path(texture.path), check_existing=True)
+        full_path: str = get_absolute_asset_path(texture.path)
         if bpy.data.images.find(texture.name) == -1:
             print("Image not found, ignoring. [%s]" % texture.name)
-            custom_img.name = "UNLINKED_" + texture.name
+            texture_cache.current.get(full_path).name = "UNLINKED_" + texture.name
             return
 
-        original_img = bpy.data.images[texture.name]
-
-        nodes = get_image_nodes(custom_img)
-
-        for node in nodes:
-            node.image = original_img
+        reset_custom_image(bpy.data.images[texture.name])
 
 
 def is_node_teximage_with_image(node, image_obj) -> bool:
-    return node.bl_idname == "ShaderNodeTexImage" and node.image.name == image_obj.name
-
+    return node.bl_idname == "ShaderNodeTexImage" and node.image is not None and node.image.name == image_obj.name
 
-def is_custom_texture_used(texture_path: str, textures: List[Texture]):
-    for texture in textures:
-        if texture.path is not None and get_absolute_asset_path(texture.path) == texture_path:
-            return True
 
-    return False
-
-
-def set_material_map(image_obj, mat_obj, x: float, y: float):
-    for node in pkx_cache.mat_tex_image[mat_obj.name]:
-        if is_node_teximage_with_image(node, image_obj):
+# Mapping of the original image in the material, wherever a custom texture bound to it is
+def set_material_map(original_img, mat_obj, x: float, y: float):
+    for node in get_texture_nodes(original_img):
+        if pkx_cache.node_mats[node.as_pointer()] == mat_obj.name:
             img_vector_input_node = node.inputs[blender_compat.tex_image_in.vector].links[0].from_node
             if img_vector_input_node.bl_idname == "ShaderNodeMapping":
                 img_vector_input_node.inputs[1].default_value[0] = x
@@ -464,11 +784,9 @@ def reset_materials_maps():
 def get_armature_obj(prd: PokemonRenderData, mode: EditMode):
     shiny_model = prd.shiny.model
     if shiny_model is not None and shiny_model != "" and mode in EditMode.ANY_SHINY:
-        armature = bpy.data.armatures[1]
+        return get_shiny_armature_obj()
     else:
-        armature = bpy.data.armatures[0]
-
-    return bpy.data.objects[armature.name]
+        return get_normal_armature_obj()
 
 
 def show_armature(armature_obj, show: bool):
@@ -480,64 +798,102 @@ def show_armature(armature_obj, show: bool):
         if not child.hide_get(): # Ignore importer hidden meshes
             child.hide_render = hide
             child.hide_viewport = hide
+    visibility.manager.armature_shown(armature_obj, show)
 
 
 def allow_select_all_armatures(allow_select: bool):
     not_allow_select = not allow_select
 
-    objs = bpy.data.objects
-    for child in objs[bpy.data.armatures[0].name].children:
-        child.hide_select = not_allow_select
-
-    shiny_armature_idx = objs.find(bpy.data.armatures[1].name) if len(bpy.data.armatures) > 1 else -1
-    if shiny_armature_idx != -1:
-        for child in objs[shiny_armature_idx].children:
+    for armature_obj in get_loaded_armature_objs():
+        for child in armature_obj.children:
             child.hide_select = not_allow_select
 
 
-def remove_objects(removed_objects: List[str]):
-    objs = bpy.data.objects
-    for obj_name in removed_objects:
-        if objs.find(obj_name) == -1:
-            print("Removed object not found, ignoring. [%s]" % obj_name)
-            continue
-        obj = objs[obj_name]
-        obj.hide_render = True
-        obj.hide_viewport = True
+def get_shading_buffer(use_smooth: bool, polygon_count: int) -> np.ndarray:
+    buffer = shading_buffers.get(use_smooth)
+    if buffer is None or len(buffer) < polygon_count:
+        buffer = np.full(polygon_count, use_smooth, dtype=bool)
+        shading_buffers[use_smooth] = buffer
+    return buffer[:polygon_count]
 
 
 def update_shading(shading: ObjectShading):
     use_smooth = shading == ObjectShading.SMOOTH
 
-    objs = bpy.data.objects
-    for child in objs[bpy.data.armatures[0].name].children:
-        for polygon in child.data.polygons:
-            polygon.use_smooth = use_smooth
+    for armature_obj in get_loaded_armature_objs():
+        for child in armature_obj.children:
+            mesh = child.data
+            if pkx_cache.mesh_shading.get(mesh.name) == shading:
+                continue
 
-    shiny_armature_idx = objs.find(bpy.data.armatures[1].name) if len(bpy.data.armatures) > 1 else -1
-    if shiny_armature_idx != -1:
-        for child in objs[shiny_armature_idx].children:
-            for polygon in child.data.polygons:
-                polygon.use_smooth = use_smooth
+            mesh.polygons.foreach_set("use_smooth", get_shading_buffer(use_smooth, len(mesh.polygons)))
+            mesh.update()
+            pkx_cache.mesh_shading[mesh.name] = shading
 
 
-def get_animation_action(model: str, animation_name: AnimationName):
-    suffix = "Idle"
-    if animation_name == AnimationName.PHYSICAL_ATTACK:
-        suffix = "Physical"
-    elif animation_name == AnimationName.SPECIAL_ATTACK:
-        suffix = "Attack"
-    elif animation_name == AnimationName.TAKING_DAMAGE:
-        suffix = "Damage"
-    elif animation_name == AnimationName.FAINTING:
-        suffix = "Faint"
-
-    clean_model_name = Path(get_relative_asset_path(model)).stem
-    actions = bpy.data.actions.values()
-    for action in actions:
+def get_model_stem(model: str) -> str:
+    return Path(get_relative_asset_path(model)).stem
+
+
+# Indexes the action of every animation of the models in one pass over the actions
+def index_animation_actions(models: List[str], report_missing: bool = False):
+    stems = [get_model_stem(model) for model in models]
+    if len(bpy.data.actions) != pkx_cache.animation_actions_count:
+        pkx_cache.animation_actions.clear()
+        pkx_cache.animation_actions_count = len(bpy.data.actions)
+
+    for stem in stems:
+        for animation_name in AnimationName:
+            pkx_cache.animation_actions[(stem, animation_name)] = None
+
+    # First match in file order wins, like the scan it replaces
+    for action in bpy.data.actions:
         name = action.name
-        if name.startswith(clean_model_name) and name.endswith(suffix):
-            return action
+        for stem in stems:
+            if not name.startswith(stem):
+                continue
+            for (animation_name, suffix) in ANIMATION_SUFFIXES.items():
+                key = (stem, animation_name)
+                if pkx_cache.animation_actions[key] is None and name.endswith(suffix):
+                    pkx_cache.animation_actions[key] = action
+
+    if report_missing:
+        for stem in stems:
+            missing = [animation_name.name for animation_name in AnimationName if pkx_cache.animation_actions[(stem, animation_name)] is None]
+            if len(missing) > 0:
+                print(f"Animations not found for model {stem}: {', '.join(missing)}")
+
+
+# Action of every animation of the model found through the index
+def get_model_actions(model: str) -> list:
+    index_animation_actions([model])
+    model_stem = get_model_stem(model)
+    actions = [pkx_cache.animation_actions[(model_stem, animation_name)] for animation_name in AnimationName]
+    return [action for action in actions if action is not None]
+
+
+def get_indexed_animation_action(key: tuple[str, AnimationName]) -> Optional[bpy.types.Action]:
+    if len(bpy.data.actions) != pkx_cache.animation_actions_count:
+        return None
+
+    action = pkx_cache.animation_actions.get(key)
+    try:
+        if action is not None and not action.name.startswith(key[0]):  # Renamed since it was indexed
+            return None
+    except ReferenceError:
+        return None
+    return action
+
+
+def get_animation_action(model: str, animation_name: AnimationName):
+    clean_model_name = get_model_stem(model)
+    key = (clean_model_name, animation_name)
+    action = get_indexed_animation_action(key)
+    if action is None:
+        index_animation_actions([model])
+        action = pkx_cache.animation_actions[key]
+    if action is not None:
+        return action
 
     raise Exception(f"Animation not found for model {clean_model_name}, animation {animation_name}!{' Debugging is enabled, clear debug cache first?' if debugging else ''}")
 
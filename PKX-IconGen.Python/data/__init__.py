@@ -29,6 +29,7 @@ __all__ = [
     "pokemon_render_data",
     "render_data",
     "render_job",
+    "render_profile",
     "render_target",
     "shiny_color",
     "shiny_info",
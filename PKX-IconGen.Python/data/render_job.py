@@ -24,6 +24,7 @@ from typing import Optional
 from .game import Game
 from .render_target import RenderTarget
 from .pokemon_render_data import PokemonRenderData
+from .render_profile import RenderProfile
 
 
 class RenderJob(object):
@@ -42,7 +43,8 @@ class RenderJob(object):
                  box_second_main_path: str,
                  box_second_shiny_path: str,
                  box_third_main_path: str,
-                 box_third_shiny_path: str):
+                 box_third_shiny_path: str,
+                 render_profile: Optional[RenderProfile] = None):
         self.data = data
         self.scale = scale
         self.game = game
@@ -57,12 +59,17 @@ class RenderJob(object):
         self.box_second_shiny_path = box_second_shiny_path
         self.box_third_main_path = box_third_main_path
         self.box_third_shiny_path = box_third_shiny_path
+        self.render_profile = render_profile
 
     @staticmethod
     def parse_obj(obj: Optional[any]) -> Optional['RenderJob']:
         if obj is None:
             return obj
 
+        render_profile: Optional[RenderProfile] = None
+        if "render_profile" in obj.__dict__.keys():
+            render_profile = RenderProfile.parse_obj(obj.render_profile)
+
         return RenderJob(
             PokemonRenderData.parse_obj(obj.data),
             obj.scale,
@@ -77,7 +84,8 @@ class RenderJob(object):
             obj.box_second_main_path,
             obj.box_second_shiny_path,
             obj.box_third_main_path,
-            obj.box_third_shiny_path
+            obj.box_third_shiny_path,
+            render_profile
         )
 
     @staticmethod
@@ -0,0 +1,80 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from enum import IntEnum
+from typing import Optional, Final
+
+
+class RenderEngine(IntEnum):
+    TEMPLATE = 0  # Whatever template.blend is set to
+    CYCLES_CPU = 1
+    WORKBENCH = 2
+
+
+class Denoiser(IntEnum):
+    NONE = 0
+    OPENIMAGEDENOISE = 1
+
+
+class RenderProfile(object):
+
+    def __init__(self, engine: RenderEngine, samples: Optional[int] = None, adaptive_threshold: Optional[float] = None, denoiser: Denoiser = Denoiser.NONE, tile_size: Optional[int] = None):
+        self.engine = engine
+        self.samples = samples
+        self.adaptive_threshold = adaptive_threshold  # 0 disables adaptive sampling
+        self.denoiser = denoiser
+        self.tile_size = tile_size
+
+    @staticmethod
+    def get_preset(name: str) -> 'RenderProfile':
+        if name not in PRESETS:
+            raise Exception(f"Unknown render profile preset: {name}")
+
+        preset = PRESETS[name]
+        return RenderProfile(preset.engine, preset.samples, preset.adaptive_threshold, preset.denoiser, preset.tile_size)
+
+    # Either a preset name, or an object with an optional preset and the values to override
+    @staticmethod
+    def parse_obj(obj: Optional[any]) -> Optional['RenderProfile']:
+        if obj is None:
+            return obj
+        if isinstance(obj, str):
+            return RenderProfile.get_preset(obj)
+
+        keys = obj.__dict__.keys()
+        profile = RenderProfile.get_preset(obj.preset) if "preset" in keys else RenderProfile(RenderEngine.TEMPLATE)
+        if "engine" in keys:
+            profile.engine = RenderEngine(obj.engine)
+        if "samples" in keys:
+            profile.samples = obj.samples
+        if "adaptive_threshold" in keys:
+            profile.adaptive_threshold = obj.adaptive_threshold
+        if "denoiser" in keys:
+            profile.denoiser = Denoiser(obj.denoiser)
+        if "tile_size" in keys:
+            profile.tile_size = obj.tile_size
+
+        return profile
+
+
+PRESETS: Final[dict[str, RenderProfile]] = {
+    "template": RenderProfile(RenderEngine.TEMPLATE),
+    "draft": RenderProfile(RenderEngine.CYCLES_CPU, 16, 0.1, Denoiser.OPENIMAGEDENOISE, 256),
+    "final": RenderProfile(RenderEngine.CYCLES_CPU, 256, 0.01, Denoiser.OPENIMAGEDENOISE, 2048),
+    "workbench": RenderProfile(RenderEngine.WORKBENCH)
+}
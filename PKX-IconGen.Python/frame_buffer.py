@@ -0,0 +1,164 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Final, Optional
+
+"""
+Ring buffer of rendered frames in a memory-mapped file, shared between render.py and the host reading the frames.
+Only uses the standard library, the reader side runs with any Python 3 interpreter.
+
+File header, little endian: magic "PKXF", version u32, slot count u32, slot payload size u32, written count u64, read count u64
+Each slot: sequence u64, EditMode value u32, width u32, height u32, payload size u32, then 8-bit RGBA rows from top to bottom
+A frame with sequence n is in slot n % slot count. The writer waits when every slot holds a frame the reader did not release.
+
+Usage (consumer stand-in): python frame_buffer.py <path> [<output folder>]
+"""
+
+MAGIC: Final[bytes] = b"PKXF"
+VERSION: Final[int] = 1
+FILE_HEADER: Final[struct.Struct] = struct.Struct("<4sIIIQQ")
+SLOT_HEADER: Final[struct.Struct] = struct.Struct("<QIIII")
+WRITTEN_OFFSET: Final[int] = 16
+READ_OFFSET: Final[int] = 24
+COUNTER: Final[struct.Struct] = struct.Struct("<Q")
+DEFAULT_SLOT_COUNT: Final[int] = 8
+POLL_INTERVAL: Final[float] = 0.005
+
+
+class Frame(object):
+
+    def __init__(self, sequence: int, mode: int, width: int, height: int, pixels: memoryview):
+        self.sequence = sequence
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.pixels = pixels  # Points into the mapped file, only valid until the frame is released
+
+
+class FrameBuffer(object):
+
+    def __init__(self, path: str, mapped: mmap.mmap):
+        self.path = path
+        self.mapped = mapped
+        (magic, version, self.slot_count, self.slot_size, _, _) = FILE_HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{path} is not a frame buffer of version {VERSION}.")
+
+    def get_counter(self, offset: int) -> int:
+        return COUNTER.unpack_from(self.mapped, offset)[0]
+
+    def set_counter(self, offset: int, value: int):
+        COUNTER.pack_into(self.mapped, offset, value)
+
+    def get_slot_offset(self, sequence: int) -> int:
+        return FILE_HEADER.size + (sequence % self.slot_count) * (SLOT_HEADER.size + self.slot_size)
+
+    def close(self):
+        self.mapped.close()
+
+
+class FrameBufferWriter(FrameBuffer):
+
+    @staticmethod
+    def create(path: str, slot_size: int, slot_count: int = DEFAULT_SLOT_COUNT) -> 'FrameBufferWriter':
+        size = FILE_HEADER.size + slot_count * (SLOT_HEADER.size + slot_size)
+        folder, name = os.path.split(os.path.abspath(path))
+        temp_path = os.path.join(folder, f".{os.getpid()}-{name}")
+        with open(temp_path, "wb") as file:
+            file.write(FILE_HEADER.pack(MAGIC, VERSION, slot_count, slot_size, 0, 0))
+            file.truncate(size)
+        os.replace(temp_path, path)  # A reader waiting for the file never maps it before the header and size are there
+
+        with open(path, "r+b") as file:
+            return FrameBufferWriter(path, mmap.mmap(file.fileno(), size))
+
+    def publish(self, mode: int, width: int, height: int, pixels: bytes) -> int:
+        if len(pixels) > self.slot_size:
+            raise Exception(f"Frame of {width}x{height} does not fit in a {self.slot_size} bytes slot.")
+
+        sequence = self.get_counter(WRITTEN_OFFSET)
+        waited: bool = False
+        while sequence - self.get_counter(READ_OFFSET) >= self.slot_count:
+            if not waited:
+                print(f"Frame buffer is full, waiting for the reader. [{self.path}]")
+                waited = True
+            time.sleep(POLL_INTERVAL)
+
+        offset = self.get_slot_offset(sequence)
+        self.mapped[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(pixels)] = pixels
+        SLOT_HEADER.pack_into(self.mapped, offset, sequence, mode, width, height, len(pixels))
+        # Only visible to the reader once the slot is complete
+        self.set_counter(WRITTEN_OFFSET, sequence + 1)
+        return sequence
+
+
+class FrameBufferReader(FrameBuffer):
+
+    @staticmethod
+    def open(path: str) -> 'FrameBufferReader':
+        with open(path, "r+b") as file:
+            return FrameBufferReader(path, mmap.mmap(file.fileno(), 0))
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Frame]:
+        sequence = self.get_counter(READ_OFFSET)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.get_counter(WRITTEN_OFFSET) <= sequence:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+        offset = self.get_slot_offset(sequence)
+        (slot_sequence, mode, width, height, payload_size) = SLOT_HEADER.unpack_from(self.mapped, offset)
+        start = offset + SLOT_HEADER.size
+        return Frame(slot_sequence, mode, width, height, memoryview(self.mapped)[start:start + payload_size])
+
+    def release(self, frame: Frame):
+        frame.pixels.release()
+        self.set_counter(READ_OFFSET, frame.sequence + 1)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python frame_buffer.py <path> [<output folder>]")
+        sys.exit(2)
+
+    output_folder: Optional[str] = sys.argv[2] if len(sys.argv) > 2 else None
+    while not os.path.isfile(sys.argv[1]):
+        time.sleep(POLL_INTERVAL)
+
+    reader = FrameBufferReader.open(sys.argv[1])
+    try:
+        while True:
+            read_frame = reader.read()
+            print(f"Frame {read_frame.sequence}: mode {read_frame.mode}, {read_frame.width}x{read_frame.height}", flush=True)
+            if output_folder is not None:
+                # Same layout as render_capture raw output
+                with open(os.path.join(output_folder, f"frame_{read_frame.sequence}_{read_frame.mode}.rgba"), "wb") as raw_file:
+                    raw_file.write(b"PKXR")
+                    raw_file.write(struct.pack("<II", read_frame.width, read_frame.height))
+                    raw_file.write(read_frame.pixels)
+            reader.release(read_frame)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -0,0 +1,63 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import struct
+from typing import Final, Optional
+
+"""
+Dimensions of PNG, TGA and DDS files read from their header, without loading the image.
+Only uses the standard library. Results are cached by path and modification time.
+"""
+
+PNG_SIGNATURE: Final[bytes] = b"\x89PNG\r\n\x1a\n"
+DDS_MAGIC: Final[bytes] = b"DDS "
+TGA_IMAGE_TYPES: Final[set[int]] = {1, 2, 3, 9, 10, 11}  # Color mapped, true color, grayscale, uncompressed or RLE
+HEADER_SIZE: Final[int] = 24
+
+# Absolute path -> (modification time, (width, height) or None when not understood)
+probed_sizes: dict[str, tuple[float, Optional[tuple[int, int]]]] = {}
+
+
+def read_size(header: bytes, extension: str) -> Optional[tuple[int, int]]:
+    if header.startswith(PNG_SIGNATURE) and header[12:16] == b"IHDR":
+        return struct.unpack(">II", header[16:24])
+    if header.startswith(DDS_MAGIC):
+        (height, width) = struct.unpack("<II", header[12:20])
+        return width, height
+    # TGA has no magic, only trust it with its extension
+    if extension == ".tga" and len(header) >= 18 and header[2] in TGA_IMAGE_TYPES:
+        return struct.unpack("<HH", header[12:16])
+    return None
+
+
+# (width, height) of the file, None when the format is not supported or the header is invalid
+def get_image_size(path: str) -> Optional[tuple[int, int]]:
+    mtime = os.path.getmtime(path)
+    probed = probed_sizes.get(path)
+    if probed is not None and probed[0] == mtime:
+        return probed[1]
+
+    with open(path, "rb") as file:
+        header = file.read(HEADER_SIZE)
+
+    size = read_size(header, os.path.splitext(path)[1].lower())
+    if size is not None and (size[0] == 0 or size[1] == 0):
+        size = None
+    probed_sizes[path] = (mtime, size)
+    return size
@@ -0,0 +1,138 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import tracemalloc
+from typing import Final, Optional, Any
+
+import bpy
+
+import common
+from texture_cache import get_image_bytes
+
+"""
+Memory use of a process rendering several jobs with --memory-profile, to find what leaks from one job to the next.
+Each job samples process RSS, Python allocations and bpy.data datablocks after each phase, then emits a single "memory" record.
+The record has the differences with the end of the previous job, and the values that grew at the end of each of the last jobs.
+"""
+
+TRACEMALLOC_FRAMES: Final[int] = 8
+TOP_ALLOCATION_COUNT: Final[int] = 10
+GROWTH_JOB_COUNT: Final[int] = 3  # Values growing after this many jobs in a row are flagged
+
+phase_samples: dict[str, dict[str, int]] = {}
+last_job_sample: Optional[dict[str, int]] = None
+last_job_snapshot: Optional[tracemalloc.Snapshot] = None
+# Value name -> value at the end of the last jobs
+job_history: dict[str, list[int]] = {}
+
+
+def get_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    # noinspection PyBroadException
+    try:
+        import resource
+        # Peak and not current, in KiB on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if os.uname().sysname == "Darwin" else 1024)
+    except Exception:
+        return None
+
+
+def sample_datablocks(sample: dict[str, int]):
+    data = bpy.data
+    sample["images"] = len(data.images)
+    sample["image_bytes"] = sum([get_image_bytes(image) for image in data.images])
+    sample["meshes"] = len(data.meshes)
+    sample["mesh_vertices"] = sum([len(mesh.vertices) for mesh in data.meshes])
+    sample["materials"] = len(data.materials)
+    sample["material_nodes"] = sum([len(mat.node_tree.nodes) for mat in data.materials if mat.node_tree is not None])
+    sample["actions"] = len(data.actions)
+    sample["action_fcurves"] = sum([len(action.fcurves) for action in data.actions])
+    sample["node_groups"] = len(data.node_groups)
+    sample["node_group_nodes"] = sum([len(group.nodes) for group in data.node_groups])
+
+
+def sample(phase: str):
+    if not common.memory_profiling:
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    phase_sample: dict[str, int] = {}
+    rss = get_rss()
+    if rss is not None:
+        phase_sample["rss"] = rss
+    phase_sample["python_allocated"] = tracemalloc.get_traced_memory()[0]
+    sample_datablocks(phase_sample)
+    phase_samples[phase] = phase_sample
+
+
+def get_growing_values() -> list[str]:
+    growing: list[str] = []
+    for (name, values) in job_history.items():
+        last_values = values[-(GROWTH_JOB_COUNT + 1):]
+        if len(last_values) > GROWTH_JOB_COUNT and all(last_values[i] < last_values[i + 1] for i in range(GROWTH_JOB_COUNT)):
+            growing.append(name)
+    return growing
+
+
+def get_top_allocations(snapshot: tracemalloc.Snapshot) -> list[str]:
+    if last_job_snapshot is None:
+        return [str(stat) for stat in snapshot.statistics("lineno")[:TOP_ALLOCATION_COUNT]]
+    return [str(stat) for stat in snapshot.compare_to(last_job_snapshot, "lineno")[:TOP_ALLOCATION_COUNT]]
+
+
+# Called once the job is over and the scene reset, emits the job's record
+def finish_job(name: str):
+    global last_job_sample
+    global last_job_snapshot
+
+    if not common.memory_profiling:
+        return
+
+    sample("end")
+    end_sample = phase_samples["end"]
+    for (value_name, value) in end_sample.items():
+        job_history.setdefault(value_name, []).append(value)
+        del job_history[value_name][:-(GROWTH_JOB_COUNT + 1)]
+
+    deltas: dict[str, int] = {}
+    if last_job_sample is not None:
+        for (value_name, value) in end_sample.items():
+            deltas[value_name] = value - last_job_sample.get(value_name, 0)
+
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    record: dict[str, Any] = {
+        "phases": dict(phase_samples),
+        "deltas": deltas,
+        "growing": get_growing_values(),
+        "top_allocations": get_top_allocations(snapshot)
+    }
+    if len(record["growing"]) > 0:
+        print(f"Growing over the last {GROWTH_JOB_COUNT} jobs: {', '.join(record['growing'])}")
+    common.emit_record("memory", name=name, **record)
+
+    last_job_sample = end_sample
+    last_job_snapshot = snapshot
+    phase_samples.clear()
@@ -0,0 +1,58 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+"""
+Named timing spans, summed by name over a job and emitted as a single "timings" record once the job is done.
+Spans timed before a job starts, like argument parsing, count towards the next job.
+"""
+
+
+class JobMetrics(object):
+
+    def __init__(self):
+        self.spans: dict[str, float] = {}  # Name -> total seconds
+        self.counts: dict[str, int] = {}  # Name -> times the span was entered
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+
+current: JobMetrics = JobMetrics()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.add(name, time.perf_counter() - start)
+
+
+# Metrics of the job that just ended, the next spans go to a new job
+def finish_job() -> JobMetrics:
+    global current
+
+    job_metrics = current
+    current = JobMetrics()
+    return job_metrics
@@ -0,0 +1,131 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import glob
+import hashlib
+import importlib
+import os
+from pathlib import Path
+from typing import Final, Optional
+
+import bpy
+
+import patcher
+
+"""
+Imported models stored as .blend files named after the model and a key, appended instead of running the importer again.
+The key is the SHA-256 of the model bytes, the importer's sources and patcher.PATCHES_VERSION: changing any of them
+misses the cache, and writing the new entry removes the entries of the same model with other keys.
+Imported armatures keep their key in a custom property, armatures kept in a .blend with another key are stale.
+"""
+
+KEY_PROPERTY: Final[str] = "pkx_model_key"
+
+importer_hash: Optional[str] = None
+
+
+def get_importer_hash() -> str:
+    global importer_hash
+
+    if importer_hash is None:
+        digest = hashlib.sha256()
+        for importer_path in importlib.import_module("importer").__path__:
+            for (folder, _, files) in sorted(os.walk(importer_path)):
+                for file in sorted(files):
+                    if not file.endswith(".py"):
+                        continue
+                    path = os.path.join(folder, file)
+                    digest.update(os.path.relpath(path, importer_path).encode())
+                    with open(path, "rb") as source_file:
+                        digest.update(source_file.read())
+        importer_hash = digest.hexdigest()
+    return importer_hash
+
+
+def get_model_key(model_bytes: bytes) -> str:
+    digest = hashlib.sha256(model_bytes)
+    digest.update(get_importer_hash().encode())
+    digest.update(str(patcher.PATCHES_VERSION).encode())
+    return digest.hexdigest()
+
+
+def get_file_key(model_path: str) -> str:
+    with open(model_path, "rb") as model_file:
+        return get_model_key(model_file.read())
+
+
+def get_entry_path(cache_path: str, model_path: str, key: str) -> str:
+    return os.path.join(cache_path, f"{Path(model_path).name}-{key}.blend")
+
+
+def get_armature_key(armature_obj) -> Optional[str]:
+    return armature_obj.get(KEY_PROPERTY)
+
+
+# Appends the entry's objects and actions to the scene, returns its armature object
+def load_entry(entry_path: str):
+    with bpy.data.libraries.load(entry_path, link=False) as (data_from, data_to):
+        data_to.objects = list(data_from.objects)
+        data_to.actions = list(data_from.actions)
+
+    armature_obj = None
+    collection = bpy.context.scene.collection
+    for obj in data_to.objects:
+        if obj is None:
+            continue
+        collection.objects.link(obj)
+        if obj.type == "ARMATURE":
+            armature_obj = obj
+    return armature_obj
+
+
+def get_material_images(objs: list) -> list:
+    images = []
+    for obj in objs:
+        for slot in obj.material_slots:
+            if slot.material is None or slot.material.node_tree is None:
+                continue
+            for node in slot.material.node_tree.nodes:
+                if node.bl_idname == "ShaderNodeTexImage" and node.image is not None and node.image not in images:
+                    images.append(node.image)
+    return images
+
+
+# Writes the armature, its children and the model's actions, then removes the entries of the model with other keys
+def write_entry(cache_path: str, model_path: str, key: str, armature_obj, actions: list):
+    objs = [armature_obj] + list(armature_obj.children)
+    # The entry holds the pixels of the images loaded from files, packing any other image would change it
+    packed_images = [image for image in get_material_images(objs)
+                     if image.packed_file is None and image.filepath != "" and os.path.isfile(bpy.path.abspath(image.filepath))]
+    for image in packed_images:
+        image.pack()
+
+    entry_path = get_entry_path(cache_path, model_path, key)
+    temp_path = os.path.join(cache_path, f".{os.getpid()}-{os.path.basename(entry_path)}")
+    try:
+        bpy.data.libraries.write(temp_path, set(objs + actions), fake_user=True)
+    finally:
+        # Only the entry holds them packed, the opened .blend stays as the import left it
+        for image in packed_images:
+            image.unpack(method="REMOVE")
+    os.replace(temp_path, entry_path)  # Other processes sharing the cache never see a partial entry
+
+    for stale_path in glob.glob(get_entry_path(glob.escape(cache_path), glob.escape(model_path), "?" * len(key))):
+        if stale_path != entry_path:
+            print(f"Removing stale cached model: {stale_path}")
+            os.remove(stale_path)
@@ -24,6 +24,7 @@ sys.path.append(os.getcwd())
 
 from data.pokemon_render_data import PokemonRenderData
 import common
+import profiling
 from addon import register
 
 if __name__ == "__main__":
@@ -54,5 +55,6 @@ if __name__ == "__main__":
         common.print_verbose(f"Input: {json}")
         prd = PokemonRenderData.from_json(json)
 
-    common.import_models(prd)
-    register(prd)
+    with profiling.profile_job(f"modify-{prd.output_name or prd.name}"):
+        common.import_models(prd)
+        register(prd)
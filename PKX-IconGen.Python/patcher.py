@@ -18,7 +18,7 @@
 import common
 from blender_data_enums import *
 from math import radians
-from typing import Optional
+from typing import Optional, Final
 
 import blender_compat
 import bpy
@@ -35,6 +35,10 @@ Patches with a !! means the patch fixes issues, otherwise it's just specific vis
 """
 
 
+# Cached imported models depend on it, bump it when patches change, see model_cache
+PATCHES_VERSION: Final[int] = 1
+
+
 def apply_patches_by_model_name(model_path: Optional[str]):
     if model_path is None:
         return
@@ -0,0 +1,71 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+from contextlib import contextmanager
+from typing import Final, Iterator
+
+import common
+
+"""
+cProfile capture of a job with --profile <folder>, a .prof file per job plus a text report of the slowest calls.
+The .prof files can be opened with pstats, snakeviz or any other cProfile viewer.
+"""
+
+REPORT_CALL_COUNT: Final[int] = 40
+
+profiled_jobs: int = 0
+
+
+def get_profile_base_path(name: str) -> str:
+    global profiled_jobs
+
+    profiled_jobs += 1
+    safe_name = re.sub(r"[^\w.-]", "_", name)
+    # Workers of a pool share the folder
+    return os.path.join(common.profile_path, f"{safe_name}-{os.getpid()}-{profiled_jobs}")
+
+
+def write_report(profile: cProfile.Profile, report_path: str):
+    report = io.StringIO()
+    stats = pstats.Stats(profile, stream=report)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_CALL_COUNT)
+    with open(report_path, "w") as report_file:
+        report_file.write(report.getvalue())
+
+
+@contextmanager
+def profile_job(name: str) -> Iterator[None]:
+    if common.profile_path is None:
+        yield
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        base_path = get_profile_base_path(name)
+        profile.dump_stats(base_path + ".prof")
+        write_report(profile, base_path + ".txt")
+        print(f"Profile: {base_path}.prof")
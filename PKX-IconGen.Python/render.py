@@ -15,11 +15,15 @@
     You should have received a copy of the GNU General Public License
     along with this program.  If not, see <https://www.gnu.org/licenses/>. 
 """
-from typing import Optional, List
+from typing import Optional, List, TextIO, Final, Any
 
 import bpy
 import sys
 import os
+import json as json_module
+import shutil
+import tempfile
+import traceback
 
 sys.path.append(os.getcwd())
 
@@ -31,25 +35,43 @@ from data.light import Light
 from data.pokemon_render_data import PokemonRenderData
 from data.edit_mode import EditMode
 from data.render_job import RenderJob
+from data.render_profile import RenderProfile, RenderEngine, Denoiser
 from data.render_target import RenderTarget
 
 import camera_resolver
 import common
-
-last_rendered_mode: Optional[EditMode] = None
-
-
-def reset_all(prd: PokemonRenderData):
-    global last_rendered_mode
-    if last_rendered_mode is not None:
-        for texture in prd.get_mode_textures(last_rendered_mode):
-            common.reset_texture_images(texture)
-        common.reset_materials_maps()
-
-
-def sync_prd_to_scene(prd: PokemonRenderData, mode: EditMode):
-    common.switch_model(prd.shiny, mode)
-
+import memory_profile
+import metrics
+import profiling
+import render_animation
+import render_border
+import render_capture
+import render_manifest
+import scene_state
+
+loaded_models: Optional[tuple[str, Optional[str]]] = None
+
+# (path from the scene, property) changed by render profiles
+RENDER_PROFILE_SETTINGS: Final[List[tuple[str, str]]] = [
+    ("render", "engine"),
+    ("cycles", "device"),
+    ("cycles", "samples"),
+    ("cycles", "use_adaptive_sampling"),
+    ("cycles", "adaptive_threshold"),
+    ("cycles", "use_denoising"),
+    ("cycles", "denoiser"),
+    ("cycles", "use_auto_tile"),
+    ("cycles", "tile_size"),
+    ("display.shading", "light"),
+    ("display.shading", "color_type")
+]
+template_render_settings: Optional[dict[tuple[str, str], Any]] = None
+
+
+# Only applies what differs from the last synced mode, see scene_state
+# The frame is set first: re-evaluating the scene puts back keyed values, see render_job_animation
+def sync_prd_to_scene(prd: PokemonRenderData, mode: EditMode, render_scale: Optional[int] = None):
+    state = scene_state.current
     objs = bpy.data.objects
     scene = bpy.data.scenes["Scene"]
     armature = common.get_armature_obj(prd, mode)
@@ -57,30 +79,33 @@ def sync_prd_to_scene(prd: PokemonRenderData, mode: EditMode):
     focus = objs[common.CAMERA_FOCUS_NAME]
     light = objs["PKXIconGen_TopLight"]
 
-    prd_camera: Camera = prd.get_mode_camera(mode) or camera_resolver.get_default_camera(RenderTarget[scene.main_mode], mode, prd)
-    prd_light: Light = prd_camera.light or Light.default(RenderTarget[scene.main_mode])
     animation_name: AnimationName = prd.get_mode_animation_name(mode) or AnimationName.IDLE
     animation_frame: int = prd.get_mode_animation_frame(mode) or 0
 
-    camera.location = prd_camera.pos.to_mathutils_vector()
-    focus.location = prd_camera.focus.to_mathutils_vector()
-    camera.data.type = "ORTHO" if prd_camera.is_ortho else "PERSP"
-    camera.data.angle = radians(prd_camera.fov)
-    camera.data.ortho_scale = prd_camera.ortho_scale
+    with metrics.span("set_action"):
+        state.set_action(armature, common.get_animation_action(prd.get_mode_model(mode), animation_name))
+    with metrics.span("frame_set"):
+        state.set_frame(scene, animation_frame)
+
+    with metrics.span("switch_model"):
+        state.switch_model(prd.shiny, mode)
 
-    light.data.type = prd_light.type.name
-    light.data.energy = prd_light.strength
-    light.data.color = prd_light.color.to_list()
-    light.location[2] = prd_light.distance
+    # Default camera is fitted to the meshes of the mode's model, it must be shown first
+    prd_camera: Camera = prd.get_mode_camera(mode) or camera_resolver.get_default_camera(RenderTarget[scene.main_mode], mode, prd)
+    prd_light: Light = prd_camera.light or Light.default(RenderTarget[scene.main_mode])
 
-    armature.animation_data.action = common.get_animation_action(prd.get_mode_model(mode), animation_name)
-    scene.frame_set(animation_frame)
+    state.set_camera(camera, focus, prd_camera.pos.to_mathutils_vector(), prd_camera.focus.to_mathutils_vector(),
+                     prd_camera.is_ortho, radians(prd_camera.fov), prd_camera.ortho_scale)
+    state.set_light(light, prd_light.type.name, prd_light.strength, prd_light.color.to_list(), prd_light.distance)
 
-    common.remove_objects(prd.get_mode_removed_objects(mode))
+    with metrics.span("remove_objects"):
+        state.set_hidden_objects(prd.get_mode_removed_objects(mode))
 
-    common.set_textures(prd.get_mode_textures(mode))
+    with metrics.span("set_textures"):
+        state.set_textures(prd.get_mode_textures(mode), render_scale)
 
-    common.update_shading(prd.get_mode_shading(mode))
+    with metrics.span("update_shading"):
+        state.set_shading(prd.get_mode_shading(mode))
 
 
 def get_mode_base_resolution(mode: EditMode, game: Game) -> int:
@@ -94,52 +119,79 @@ def get_mode_base_resolution(mode: EditMode, game: Game) -> int:
     return base_resolution
 
 
-def render_job_mode(render_job: RenderJob, path: str, mode: EditMode):
-    global last_rendered_mode
+def get_scene_struct(scene, path: str):
+    struct = scene
+    for attr in path.split("."):
+        struct = getattr(struct, attr)
+    return struct
 
-    blender_render = bpy.data.scenes["Scene"].render
 
-    base_resolution = get_mode_base_resolution(mode, render_job.game)
-
-    blender_render.resolution_x = base_resolution * render_job.scale
-    blender_render.resolution_y = base_resolution * render_job.scale
+# Puts back the template's settings first, jobs without a profile render like the template
+def apply_render_profile(profile: Optional[RenderProfile]):
+    global template_render_settings
 
-    reset_all(render_job.data)
-    sync_prd_to_scene(render_job.data, mode)
-    blender_render.filepath = path
-    bpy.ops.render.render(animation=False, write_still=True, use_viewport=True)
-    last_rendered_mode = mode
+    scene = bpy.data.scenes["Scene"]
+    if template_render_settings is None:
+        template_render_settings = {}
+        for (path, prop) in RENDER_PROFILE_SETTINGS:
+            template_render_settings[(path, prop)] = getattr(get_scene_struct(scene, path), prop)
+    for ((path, prop), value) in template_render_settings.items():
+        setattr(get_scene_struct(scene, path), prop, value)
+
+    if profile is None or profile.engine is RenderEngine.TEMPLATE:
+        return
+
+    if profile.engine is RenderEngine.WORKBENCH:
+        scene.render.engine = "BLENDER_WORKBENCH"
+        scene.display.shading.light = "STUDIO"
+        scene.display.shading.color_type = "TEXTURE"
+    elif profile.engine is RenderEngine.CYCLES_CPU:
+        scene.render.engine = "CYCLES"
+        cycles = scene.cycles
+        cycles.device = "CPU"
+        if profile.samples is not None:
+            cycles.samples = profile.samples
+        if profile.adaptive_threshold is not None:
+            cycles.use_adaptive_sampling = profile.adaptive_threshold > 0
+            if cycles.use_adaptive_sampling:
+                cycles.adaptive_threshold = profile.adaptive_threshold
+        cycles.use_denoising = profile.denoiser is not Denoiser.NONE
+        if profile.denoiser is Denoiser.OPENIMAGEDENOISE:
+            cycles.denoiser = "OPENIMAGEDENOISE"
+        if profile.tile_size is not None:
+            cycles.use_auto_tile = True
+            cycles.tile_size = profile.tile_size
+    else:
+        raise Exception(f"Unknown render engine: {profile.engine.name}")
 
 
-if __name__ == "__main__":
-    # noinspection DuplicatedCode
-    debug_json: Optional[str] = None
-    debug_egg: Optional[str] = None
-    job: RenderJob
-
-    common.parse_cmd_args(sys.argv[sys.argv.index("--") + 1:])
-    for arg, value in common.cmd_args:
-        if arg == "--pkx-debug":
-            debug_json = value
-        elif arg == "--debug-egg":
-            debug_egg = value
+def render_job_mode(render_job: RenderJob, path: str, mode: EditMode):
+    blender_render = bpy.data.scenes["Scene"].render
 
-    if debug_json is not None:
-        common.attach_debugger(debug_egg)
+    base_resolution = get_mode_base_resolution(mode, render_job.game)
 
-        file = open(debug_json, "r")
-        json = file.readline()
-        file.close()
+    blender_render.resolution_x = base_resolution * render_job.scale
+    blender_render.resolution_y = base_resolution * render_job.scale
 
-        common.print_verbose(f"Rendering: {json}")
-        job: RenderJob = RenderJob.from_json(json)
+    with metrics.span("sync_prd_to_scene"):
+        sync_prd_to_scene(render_job.data, mode, render_job.scale)
+    if common.auto_border:
+        with metrics.span("auto_border"):
+            render_border.set_border(bpy.data.scenes["Scene"], render_border.get_model_border(bpy.data.scenes["Scene"]))
+    if render_capture.is_enabled():
+        render_capture.ensure_viewer_node(bpy.data.scenes["Scene"])
+        with metrics.span("render"):
+            bpy.ops.render.render(animation=False, write_still=False, use_viewport=True)
+        with metrics.span("capture"):
+            render_capture.capture(path, mode)
     else:
-        json = sys.stdin.readline()
+        with metrics.span("render"):
+            bpy.ops.render.render(animation=False, write_still=False, use_viewport=True)
+        with metrics.span("write_image"):
+            bpy.data.images["Render Result"].save_render(path)
 
-        common.print_verbose(f"Rendering: {json}")
-        job: RenderJob = RenderJob.from_json(json)
 
-    common.import_models(job.data)
+def get_render_targets(job: RenderJob) -> List[tuple[str, EditMode]]:
     render_targets: List[tuple[str, EditMode]] = []
     if RenderTarget.FACE in job.target:
         render_targets.append((job.face_main_path, EditMode.FACE_NORMAL))
@@ -162,5 +214,328 @@ if __name__ == "__main__":
             render_targets.append((job.box_third_main_path, EditMode.BOX_THIRD))
             render_targets.append((job.box_third_shiny_path, EditMode.BOX_THIRD_SHINY))
 
-    for target in render_targets:
-        render_job_mode(job, target[0], target[1])
+    return render_targets
+
+
+# Everything the scene is set to for a mode, modes with the same key render the exact same image
+def get_mode_state_key(job: RenderJob, mode: EditMode) -> str:
+    prd = job.data
+    uses_shiny_filter = prd.shiny.color1 is not None and prd.shiny.color2 is not None
+
+    state = {
+        "resolution": get_mode_base_resolution(mode, job.game),
+        "model": prd.get_mode_model(mode),
+        "shiny_filter": uses_shiny_filter and mode in EditMode.ANY_SHINY,
+        "camera": prd.get_mode_camera(mode),  # Without a camera, the default one is resolved from the model
+        "animation_name": prd.get_mode_animation_name(mode),
+        "animation_frame": prd.get_mode_animation_frame(mode),
+        "removed_objects": sorted(prd.get_mode_removed_objects(mode)),
+        "textures": prd.get_mode_textures(mode),
+        "shading": prd.get_mode_shading(mode)
+    }
+
+    return json_module.dumps(state, default=vars, sort_keys=True)
+
+
+def group_identical_targets(job: RenderJob, render_targets: List[tuple[str, EditMode]]) -> List[List[tuple[str, EditMode]]]:
+    groups: dict[str, List[tuple[str, EditMode]]] = {}
+    for (path, mode) in render_targets:
+        groups.setdefault(get_mode_state_key(job, mode), []).append((path, mode))
+
+    return list(groups.values())
+
+
+# Scene state that cannot be keyframed, modes sharing it can be rendered as frames of one animation
+def get_mode_batch_key(job: RenderJob, mode: EditMode) -> str:
+    prd = job.data
+    camera: Optional[Camera] = prd.get_mode_camera(mode)
+
+    state = {
+        "resolution": get_mode_base_resolution(mode, job.game),
+        "model": prd.get_mode_model(mode),
+        "animation_name": prd.get_mode_animation_name(mode),
+        "is_ortho": camera.is_ortho if camera is not None else None,
+        "light_type": camera.light.type if camera is not None and camera.light is not None else None,
+        "textures": prd.get_mode_textures(mode),
+        "shading": prd.get_mode_shading(mode)
+    }
+
+    return json_module.dumps(state, default=vars, sort_keys=True)
+
+
+# Groups of identical targets rendered together, a single group per batch unless the animation strategy is used
+def get_render_batches(job: RenderJob, groups: List[List[tuple[str, EditMode]]]) -> List[List[List[tuple[str, EditMode]]]]:
+    if common.render_strategy != "animation":
+        return [[group] for group in groups]
+
+    batches: dict[str, List[List[tuple[str, EditMode]]]] = {}
+    for group in groups:
+        batches.setdefault(get_mode_batch_key(job, group[0][1]), []).append(group)
+
+    return list(batches.values())
+
+
+# Keys every mode on its own frame and renders them all with one animation render
+def render_job_animation(render_job: RenderJob, render_targets: List[tuple[str, EditMode]]):
+    prd = render_job.data
+    objs = bpy.data.objects
+    scene = bpy.data.scenes["Scene"]
+    blender_render = scene.render
+    camera = objs[common.CAMERA_NAME]
+    focus = objs[common.CAMERA_FOCUS_NAME]
+    light = objs["PKXIconGen_TopLight"]
+
+    base_resolution = get_mode_base_resolution(render_targets[0][1], render_job.game)
+    blender_render.resolution_x = base_resolution * render_job.scale
+    blender_render.resolution_y = base_resolution * render_job.scale
+
+    visibility_objs = []
+    for armature_obj in common.get_loaded_armature_objs():
+        visibility_objs.append(armature_obj)
+        visibility_objs.extend(armature_obj.children)
+
+    recorder = render_animation.KeyframeRecorder()
+    border: Optional[render_border.Border] = None
+    for (frame, (_, mode)) in enumerate(render_targets, start=1):
+        if frame > 1:
+            # A frame change puts back the keyed values of earlier modes, they are applied again after it
+            scene_state.current.invalidate_keyed()
+        with metrics.span("sync_prd_to_scene"):
+            sync_prd_to_scene(prd, mode, render_job.scale)
+        if common.auto_border:
+            # Every frame shares the border
+            mode_border = render_border.get_model_border(scene)
+            border = mode_border if frame == 1 else render_border.union_borders(border, mode_border)
+
+        recorder.key(camera, "location", frame)
+        recorder.key(focus, "location", frame)
+        recorder.key(camera.data, "lens", frame)
+        recorder.key(camera.data, "ortho_scale", frame)
+        recorder.key(light.data, "energy", frame)
+        recorder.key(light.data, "color", frame)
+        recorder.key(light, "location", frame, 2)
+        for obj in visibility_objs:
+            recorder.key(obj, "hide_render", frame)
+        for node in common.pkx_cache.shiny_mix:
+            recorder.key(node.inputs[0], "default_value", frame)
+
+        armature = common.get_armature_obj(prd, mode)
+        recorder.key_action_frame(armature, armature.animation_data.action, prd.get_mode_animation_frame(mode) or 0, frame)
+
+    if common.auto_border:
+        render_border.set_border(scene, border)
+
+    frame_range = (scene.frame_start, scene.frame_end, scene.frame_step, scene.frame_current)
+    filepath = blender_render.filepath
+    with tempfile.TemporaryDirectory(prefix="pkx-frames-") as frames_folder:
+        try:
+            recorder.activate_nla()
+            scene.frame_start = 1
+            scene.frame_end = len(render_targets)
+            scene.frame_step = 1
+            blender_render.filepath = os.path.join(frames_folder, "frame_####")
+            render_animation.render_frames()
+
+            for (frame, (path, _)) in enumerate(render_targets, start=1):
+                shutil.move(blender_render.frame_path(frame=frame), path)
+        finally:
+            recorder.restore()
+            scene_state.current.invalidate()  # Keyed values are back to the first mode's
+            (scene.frame_start, scene.frame_end, scene.frame_step, frame_current) = frame_range
+            blender_render.filepath = filepath
+            scene.frame_set(frame_current)
+
+
+# Swaps the loaded models in place when the job needs other ones, save_blend keeps the imported models in the opened .blend
+def load_job_models(job: RenderJob, save_blend: bool):
+    global loaded_models
+
+    job_models = (job.data.model, job.data.shiny.model)
+    if loaded_models is not None and loaded_models != job_models:
+        common.unload_models()
+        scene_state.current.clear()
+        loaded_models = None
+
+    if loaded_models is None:
+        try:
+            with metrics.span("import_models"):
+                common.import_models(job.data, save_blend)
+        except Exception:
+            common.unload_models()  # Do not let a partial import leak into the next job
+            scene_state.current.clear()
+            raise
+        loaded_models = job_models
+    elif job.data.shiny.color1 is not None and job.data.shiny.color2 is not None:
+        common.update_all_shiny_colors(job.data.shiny.color1, job.data.shiny.color2)
+
+
+# Emits the job's "timings" record, span totals in seconds are also added to timings when given
+def render_job(job: RenderJob, save_blend: bool = True, timings: Optional[dict[str, float]] = None) -> dict[str, str]:
+    memory_profile.sample("start")
+    try:
+        with metrics.span("render_job"), profiling.profile_job(job.data.output_name or job.data.name):
+            return render_job_targets(job, save_blend)
+    finally:
+        job_metrics = metrics.finish_job()
+        common.emit_record("timings", name=job.data.output_name or job.data.name, spans=job_metrics.spans, counts=job_metrics.counts)
+        if timings is not None:
+            timings.update(job_metrics.spans)
+        memory_profile.finish_job(job.data.output_name or job.data.name)
+
+
+def render_job_targets(job: RenderJob, save_blend: bool) -> dict[str, str]:
+    outputs: dict[str, str] = {}
+    render_targets = get_render_targets(job)
+
+    manifest: Optional[render_manifest.RenderManifest] = None
+    fingerprints: dict[EditMode, str] = {}
+    if common.incremental:
+        manifest = render_manifest.RenderManifest()
+        up_to_date_targets: List[tuple[str, EditMode]] = []
+        for (path, mode) in render_targets:
+            fingerprints[mode] = render_manifest.get_mode_fingerprint(job, mode)
+            # Animation batches write files even with in-memory captures
+            for output_path in dict.fromkeys([render_capture.get_output_path(path), path]):
+                if manifest.is_up_to_date(output_path, fingerprints[mode]):
+                    up_to_date_targets.append((path, mode))
+                    outputs[mode.name] = output_path
+                    break
+
+        if len(up_to_date_targets) > 0:
+            print(f"Skipping unchanged modes: {', '.join([mode.name for (_, mode) in up_to_date_targets])}")
+            render_targets = [target for target in render_targets if target not in up_to_date_targets]
+
+        if len(render_targets) == 0:
+            return outputs  # Nothing to render, no need for the models either
+
+    with metrics.span("load_models"):
+        load_job_models(job, save_blend)
+    memory_profile.sample("load_models")
+
+    # Requested path, mode and whether the file was written by an animation batch instead of captured
+    written_targets: List[tuple[str, EditMode, bool]] = []
+    try:
+        apply_render_profile(common.get_render_profile(job.render_profile))
+        for batch in get_render_batches(job, group_identical_targets(job, render_targets)):
+            batch_targets = [group[0] for group in batch]
+            with metrics.span("mode." + "+".join([mode.name for (_, mode) in batch_targets])):
+                if len(batch_targets) == 1:
+                    render_job_mode(job, batch_targets[0][0], batch_targets[0][1])
+                else:
+                    render_job_animation(job, batch_targets)
+
+            for group in batch:
+                (path, mode) = group[0]
+                # Same scene state, the render is copied instead of done again
+                for (copy_path, copy_mode) in group[1:]:
+                    print(f"{copy_mode.name} is identical to {mode.name}, copying render")
+                    if render_capture.is_enabled() and len(batch_targets) == 1:
+                        render_capture.capture_copy(path, copy_path, copy_mode)
+                    else:
+                        shutil.copyfile(path, copy_path)
+
+                written_targets.extend([(group_path, group_mode, len(batch_targets) > 1) for (group_path, group_mode) in group])
+
+        memory_profile.sample("render")
+
+        if render_capture.is_enabled():
+            with metrics.span("write_captures"):
+                render_capture.write_captures()
+            memory_profile.sample("write_captures")
+
+        for (path, mode, batched) in written_targets:
+            output_path = path if batched else render_capture.get_output_path(path)
+            outputs[mode.name] = output_path
+            if manifest is not None:
+                manifest.update(output_path, fingerprints[mode])
+    finally:
+        render_capture.clear()
+        apply_render_profile(None)
+        render_border.reset_border(bpy.data.scenes["Scene"])
+        reset_job()
+        if manifest is not None:
+            manifest.save()
+
+    return outputs
+
+
+# Leave the scene as it was after import, so the next job in the same process starts clean
+def reset_job():
+    scene_state.current.reset()
+
+
+def run_worker(job_lines: TextIO):
+    for line in job_lines:
+        if line.strip() == "":
+            continue
+
+        job: Optional[RenderJob] = None
+        # noinspection PyBroadException
+        try:
+            common.print_verbose(f"Rendering: {line}")
+            with metrics.span("json_decode"):
+                job = RenderJob.from_json(line)
+        except Exception as e:
+            traceback.print_exc()
+            # render_job never runs, the job's timings record is emitted here
+            job_metrics = metrics.finish_job()
+            common.emit_record("timings", name=None, spans=job_metrics.spans, counts=job_metrics.counts)
+            common.emit_record("job", status="failed", name=None, error=str(e))
+
+        if job is not None:
+            run_worker_job(job)
+
+
+# Renders without saving models to the opened .blend, a failed job is reported and does not stop the process
+def run_worker_job(job: RenderJob):
+    name: str = job.data.output_name or job.data.name
+    # noinspection PyBroadException
+    try:
+        outputs = render_job(job, save_blend=False)
+        common.emit_record("job", status="done", name=name, outputs=outputs)
+    except Exception as e:
+        traceback.print_exc()
+        common.emit_record("job", status="failed", name=name, error=str(e))
+
+
+if __name__ == "__main__":
+    # noinspection DuplicatedCode
+    debug_json: Optional[str] = None
+    debug_egg: Optional[str] = None
+    job: RenderJob
+
+    with metrics.span("parse_args"):
+        common.parse_cmd_args(sys.argv[sys.argv.index("--") + 1:])
+    for arg, value in common.cmd_args:
+        if arg == "--pkx-debug":
+            debug_json = value
+        elif arg == "--debug-egg":
+            debug_egg = value
+
+    if debug_json is not None:
+        common.attach_debugger(debug_egg)
+
+    if common.worker_mode:
+        # Every line of the debug file is a job when debugging a worker
+        if debug_json is not None:
+            with open(debug_json, "r") as file:
+                run_worker(file)
+        else:
+            run_worker(sys.stdin)
+    else:
+        if debug_json is not None:
+            file = open(debug_json, "r")
+            json = file.readline()
+            file.close()
+
+            common.print_verbose(f"Rendering: {json}")
+            with metrics.span("json_decode"):
+                job: RenderJob = RenderJob.from_json(json)
+        else:
+            json = sys.stdin.readline()
+
+            common.print_verbose(f"Rendering: {json}")
+            with metrics.span("json_decode"):
+                job: RenderJob = RenderJob.from_json(json)
+
+        render_job(job)
@@ -0,0 +1,138 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+from typing import Any
+
+import bpy
+
+import metrics
+
+"""
+Temporary keyframes used to render several modes with a single animation render, one mode per frame.
+Everything keyed here is put back the way it was with restore(), including the values of the keyed properties.
+"""
+
+
+class KeyframeRecorder(object):
+
+    def __init__(self):
+        self.actions_before: set[str] = set(bpy.data.actions.keys())
+        # ID pointer -> (ID, had animation data before any key)
+        self.keyed_ids: dict[int, tuple[Any, bool]] = {}
+        # (struct pointer, data path, index) -> (struct, data path, index, value before any key)
+        self.initial_values: dict[tuple[int, str, int], tuple[Any, str, int, Any]] = {}
+        self.keys: list[tuple[Any, str, int, int]] = []
+        # Armature object pointer -> (animation data, action before the NLA strips)
+        self.replaced_actions: dict[int, tuple[Any, Any]] = {}
+        self.nla_tracks: list[tuple[Any, Any]] = []
+
+    def key(self, struct, data_path: str, frame: int, index: int = -1):
+        id_data = struct.id_data
+        if id_data.as_pointer() not in self.keyed_ids:
+            self.keyed_ids[id_data.as_pointer()] = (id_data, id_data.animation_data is not None)
+
+        value_key = (struct.as_pointer(), data_path, index)
+        if value_key not in self.initial_values:
+            value = getattr(struct, data_path)
+            if index != -1:
+                value = value[index]
+            elif hasattr(value, "__len__"):
+                value = tuple(value)
+            self.initial_values[value_key] = (struct, data_path, index, value)
+
+        struct.keyframe_insert(data_path, index=index, frame=frame)
+        self.keys.append((struct, data_path, index, frame))
+
+    # Evaluates action at action_frame when the timeline is at frame, through its own NLA track
+    def key_action_frame(self, armature_obj, action, action_frame: int, frame: int):
+        anim_data = armature_obj.animation_data
+        if armature_obj.as_pointer() not in self.replaced_actions:
+            self.replaced_actions[armature_obj.as_pointer()] = (anim_data, anim_data.action)
+
+        track = anim_data.nla_tracks.new()
+        track.name = f"PKX_Frame_{frame}"
+        strip = track.strips.new(track.name, frame, action)
+        # Action range is clamped by the other end, move the end first when going forward
+        if action_frame + 1 > strip.action_frame_end:
+            strip.action_frame_end = action_frame + 1
+            strip.action_frame_start = action_frame
+        else:
+            strip.action_frame_start = action_frame
+            strip.action_frame_end = action_frame + 1
+        strip.extrapolation = "NOTHING"  # Higher tracks win, a strip only needs to cover its own frame
+        self.nla_tracks.append((anim_data, track))
+
+    def activate_nla(self):
+        # The active action is evaluated on top of the NLA, it would hide the strips
+        for (anim_data, _) in self.replaced_actions.values():
+            anim_data.action = None
+
+    def restore(self):
+        for (anim_data, track) in self.nla_tracks:
+            anim_data.nla_tracks.remove(track)
+        for (anim_data, action) in self.replaced_actions.values():
+            anim_data.action = action
+
+        for (id_data, had_animation) in self.keyed_ids.values():
+            if not had_animation:
+                id_data.animation_data_clear()
+        for (struct, data_path, index, frame) in self.keys:
+            if self.keyed_ids[struct.id_data.as_pointer()][1]:
+                struct.keyframe_delete(data_path, index=index, frame=frame)
+
+        new_actions = [action for action in bpy.data.actions if action.name not in self.actions_before]
+        if len(new_actions) > 0:
+            bpy.data.batch_remove(ids=new_actions)
+
+        for (struct, data_path, index, value) in self.initial_values.values():
+            if index != -1:
+                getattr(struct, data_path)[index] = value
+            else:
+                setattr(struct, data_path, value)
+
+        self.keyed_ids.clear()
+        self.initial_values.clear()
+        self.keys.clear()
+        self.replaced_actions.clear()
+        self.nla_tracks.clear()
+
+
+# Renders the scene's frame range, Blender writes every frame as part of the operator
+# The time between a frame's render_post and render_write handlers goes to the "write_image" span, the rest to "render"
+def render_frames():
+    write_start: list[float] = []
+    write_seconds: list[float] = []
+
+    def on_render_post(*_args):
+        write_start.append(time.perf_counter())
+
+    def on_render_write(*_args):
+        write_seconds.append(time.perf_counter() - write_start.pop())
+
+    bpy.app.handlers.render_post.append(on_render_post)
+    bpy.app.handlers.render_write.append(on_render_write)
+    start = time.perf_counter()
+    try:
+        bpy.ops.render.render(animation=True, use_viewport=True)
+    finally:
+        bpy.app.handlers.render_post.remove(on_render_post)
+        bpy.app.handlers.render_write.remove(on_render_write)
+        metrics.current.add("render", time.perf_counter() - start - sum(write_seconds))
+        for seconds in write_seconds:
+            metrics.current.add("write_image", seconds)
@@ -0,0 +1,68 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import sys
+import os
+from types import SimpleNamespace
+from typing import List, Optional
+
+sys.path.append(os.getcwd())
+
+from data.render_job import RenderJob
+
+import common
+import render
+
+"""
+Renders every RenderJob of a manifest in a single Blender process, swapping models in the scene between jobs.
+The manifest is a JSON array of RenderJob objects, the same objects render.py reads from stdin.
+
+Usage: blender --background template.blend --python render_batch.py -- --manifest <manifest.json> [--assets-path <path>]
+"""
+
+
+def read_manifest(manifest_path: str) -> List[RenderJob]:
+    with open(manifest_path, "r") as manifest_file:
+        manifest = json.load(manifest_file, object_hook=lambda d: SimpleNamespace(**d))
+
+    return [RenderJob.parse_obj(job) for job in manifest]
+
+
+def sort_by_models(jobs: List[RenderJob]) -> List[RenderJob]:
+    # Jobs using the same models next to each other, each model is only imported once
+    return sorted(jobs, key=lambda job: (job.data.model, job.data.shiny.model or ""))
+
+
+if __name__ == "__main__":
+    manifest_path: Optional[str] = None
+
+    common.parse_cmd_args(sys.argv[sys.argv.index("--") + 1:])
+    for arg, value in common.cmd_args:
+        if arg == "--manifest":
+            manifest_path = value
+        elif arg == "--debug-egg":
+            common.attach_debugger(value)
+
+    if manifest_path is None:
+        raise Exception("No manifest provided, use --manifest <path>.")
+
+    jobs: List[RenderJob] = sort_by_models(read_manifest(manifest_path))
+    print(f"Rendering {len(jobs)} jobs from {manifest_path}")
+    for job in jobs:
+        render.run_worker_job(job)
@@ -0,0 +1,106 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Final, Optional, Any
+
+import bpy
+from bpy_extras.object_utils import world_to_camera_view
+from mathutils import Vector
+
+import common
+
+"""
+Limits rendering to the part of the frame covered by the model, icons are mostly transparent background.
+Crop to border stays off, Blender pads the rendered region back to the full resolution with transparent pixels.
+"""
+
+BORDER_MARGIN: Final[int] = 2  # Pixels around the projected bounds, covers antialiasing
+MAX_BORDER_COVERAGE: Final[float] = 0.9  # Rendering a border covering almost everything saves nothing
+BORDER_SETTINGS: Final[list[str]] = ["use_border", "use_crop_to_border", "border_min_x", "border_max_x", "border_min_y", "border_max_y"]
+
+# min x, min y, max x, max y, from 0 to 1 like render border values
+Border = tuple[float, float, float, float]
+
+template_border_settings: Optional[dict[str, Any]] = None
+
+
+# Projected bounds of the visible meshes of the loaded models, None when some of it is behind the camera
+def get_model_border(scene) -> Optional[Border]:
+    camera = bpy.data.objects[common.CAMERA_NAME]
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    near: float = camera.data.clip_start
+
+    min_x = min_y = float("inf")
+    max_x = max_y = float("-inf")
+    for armature_obj in common.get_loaded_armature_objs():
+        if armature_obj.hide_render:
+            continue
+        for child in armature_obj.children:
+            if child.type != "MESH" or child.hide_render or child.hide_get():
+                continue
+
+            evaluated = child.evaluated_get(depsgraph)  # Bounds of the posed mesh
+            for corner in evaluated.bound_box:
+                projected = world_to_camera_view(scene, camera, evaluated.matrix_world @ Vector(corner))
+                if projected.z < near:
+                    return None
+                min_x = min(min_x, projected.x)
+                min_y = min(min_y, projected.y)
+                max_x = max(max_x, projected.x)
+                max_y = max(max_y, projected.y)
+
+    if min_x > max_x:
+        return None
+
+    margin_x = BORDER_MARGIN / scene.render.resolution_x
+    margin_y = BORDER_MARGIN / scene.render.resolution_y
+    return (max(0.0, min_x - margin_x), max(0.0, min_y - margin_y), min(1.0, max_x + margin_x), min(1.0, max_y + margin_y))
+
+
+def union_borders(border: Optional[Border], other: Optional[Border]) -> Optional[Border]:
+    if border is None or other is None:
+        return None
+    return (min(border[0], other[0]), min(border[1], other[1]), max(border[2], other[2]), max(border[3], other[3]))
+
+
+def set_border(scene, border: Optional[Border]):
+    global template_border_settings
+
+    blender_render = scene.render
+    if template_border_settings is None:
+        template_border_settings = {}
+        for setting in BORDER_SETTINGS:
+            template_border_settings[setting] = getattr(blender_render, setting)
+
+    if border is None or border[0] >= border[2] or border[1] >= border[3] \
+            or (border[2] - border[0]) * (border[3] - border[1]) > MAX_BORDER_COVERAGE:
+        blender_render.use_border = False
+        return
+
+    common.print_verbose(f"Render border: {border}")
+    blender_render.use_border = True
+    blender_render.use_crop_to_border = False
+    (blender_render.border_min_x, blender_render.border_min_y, blender_render.border_max_x, blender_render.border_max_y) = border
+
+
+def reset_border(scene):
+    if template_border_settings is None:
+        return
+
+    for (setting, value) in template_border_settings.items():
+        setattr(scene.render, setting, value)
@@ -0,0 +1,237 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import struct
+from typing import Final, Optional
+
+import bpy
+import numpy as np
+
+import common
+from data.edit_mode import EditMode
+from frame_buffer import FrameBufferWriter
+
+"""
+Keeps renders in memory instead of writing a PNG after every mode, everything is written at once at the end of a job.
+Render Result pixels cannot be read from Python, renders are read back from a compositor Viewer node instead.
+
+Formats:
+    png: PNG without compression, same color management as a regular render
+    raw: PKXR magic, width and height as little endian uint32, then 8-bit RGBA rows from top to bottom, next to the requested path with a .rgba extension
+         Straight alpha sRGB, only with the sRGB display and the Standard view transform
+With --frame-buffer, the raw pixels are published to the ring buffer instead and nothing is written next to the requested paths.
+"""
+
+VIEWER_NODE_NAME: Final[str] = "PKX_Viewer"
+CAPTURE_IMAGE_NAME: Final[str] = "PKX_Capture"
+RAW_MAGIC: Final[bytes] = b"PKXR"
+MIN_FRAME_BUFFER_SLOT_SIZE: Final[int] = 1024 * 1024 * 4  # 1024x1024 RGBA, the file is sparse until slots are used
+
+
+class CapturedRender(object):
+
+    def __init__(self, path: str, mode: EditMode, width: int, height: int, pixels: np.ndarray):
+        self.path = path
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.pixels = pixels  # float32, width * height * 4, rows from bottom to top
+
+
+captured_renders: list[CapturedRender] = []
+frame_buffer_writer: Optional[FrameBufferWriter] = None
+# Requested path -> frame buffer sequence, for the last written job
+published_frames: dict[str, int] = {}
+# Template compositing before ensure_viewer_node: use_nodes, use_compositing, active node name, names of the added nodes
+template_compositing: Optional[tuple[bool, bool, Optional[str], list[str]]] = None
+
+
+def is_enabled() -> bool:
+    return common.memory_output is not None or common.frame_buffer_path is not None
+
+
+def get_output_path(path: str) -> str:
+    if path in published_frames:
+        return f"{common.frame_buffer_path}#{published_frames[path]}"
+    if common.memory_output == "raw":
+        return os.path.splitext(path)[0] + ".rgba"
+    return path
+
+
+def ensure_viewer_node(scene) -> None:
+    global template_compositing
+
+    if common.memory_output == "raw" or common.frame_buffer_path is not None:
+        check_raw_color_management(scene)  # Fails before rendering anything
+
+    if template_compositing is None:
+        active_node = scene.node_tree.nodes.active if scene.node_tree is not None else None
+        template_compositing = (scene.use_nodes, scene.render.use_compositing, active_node.name if active_node is not None else None, [])
+    added_nodes = template_compositing[3]
+
+    scene.use_nodes = True
+    scene.render.use_compositing = True
+    tree = scene.node_tree
+    if tree.nodes.find(VIEWER_NODE_NAME) != -1:
+        return
+
+    # Show what goes out of the compositor, or straight out of the render layers without a Composite node
+    source_socket = None
+    for node in tree.nodes:
+        if node.bl_idname == "CompositorNodeComposite" and len(node.inputs[0].links) > 0:
+            source_socket = node.inputs[0].links[0].from_socket
+            break
+    if source_socket is None:
+        render_layers = next((node for node in tree.nodes if node.bl_idname == "CompositorNodeRLayers"), None)
+        if render_layers is None:
+            render_layers = tree.nodes.new("CompositorNodeRLayers")
+            added_nodes.append(render_layers.name)
+        source_socket = render_layers.outputs["Image"]
+
+    viewer = tree.nodes.new("CompositorNodeViewer")
+    viewer.name = VIEWER_NODE_NAME
+    added_nodes.append(viewer.name)
+    viewer.use_alpha = True
+    tree.links.new(source_socket, viewer.inputs[0])
+    tree.nodes.active = viewer
+
+
+def capture(path: str, mode: EditMode) -> CapturedRender:
+    viewer_image = bpy.data.images["Viewer Node"]
+    width, height = viewer_image.size
+
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    viewer_image.pixels.foreach_get(pixels)
+
+    captured = CapturedRender(path, mode, width, height, pixels)
+    captured_renders.append(captured)
+    return captured
+
+
+def capture_copy(path: str, copy_path: str, copy_mode: EditMode):
+    source = next(captured for captured in captured_renders if captured.path == path)
+    captured_renders.append(CapturedRender(copy_path, copy_mode, source.width, source.height, source.pixels))
+
+
+def write_png(scene, captured: CapturedRender):
+    image = bpy.data.images.get(CAPTURE_IMAGE_NAME)
+    if image is None or tuple(image.size) != (captured.width, captured.height):
+        if image is not None:
+            bpy.data.images.remove(image)
+        image = bpy.data.images.new(CAPTURE_IMAGE_NAME, captured.width, captured.height, alpha=True, float_buffer=True)
+
+    image.pixels.foreach_set(captured.pixels)
+    image.save_render(captured.path, scene=scene)  # Applies the scene's view transform, like a regular render
+
+
+# Raw pixels are only encoded as sRGB, they would not match the PNG path with any other color management
+def check_raw_color_management(scene):
+    view_settings = scene.view_settings
+    if scene.display_settings.display_device != "sRGB" or view_settings.view_transform != "Standard" or view_settings.look != "None" \
+            or view_settings.exposure != 0 or view_settings.gamma != 1 or view_settings.use_curve_mapping:
+        raise Exception(f"Raw output needs the sRGB display with the Standard view transform and no look, exposure, gamma or curves, "
+                        f"the scene uses {scene.display_settings.display_device} with {view_settings.view_transform}.")
+
+
+def to_display_bytes(scene, captured: CapturedRender) -> bytes:
+    check_raw_color_management(scene)
+
+    rgba = captured.pixels.reshape((captured.height, captured.width, 4))[::-1]
+    alpha = np.clip(rgba[..., 3:4], 0, 1)
+    # Viewer pixels are premultiplied, PNGs have straight alpha
+    rgb = np.clip(np.divide(rgba[..., :3], alpha, out=np.zeros_like(rgba[..., :3]), where=alpha > 0), 0, 1)
+    srgb = np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1 / 2.4) - 0.055)
+
+    display = np.empty((captured.height, captured.width, 4), dtype=np.uint8)
+    display[..., :3] = np.rint(srgb * 255)
+    display[..., 3] = np.rint(alpha[..., 0] * 255)
+    return display.tobytes()
+
+
+def write_raw(scene, captured: CapturedRender):
+    with open(get_output_path(captured.path), "wb") as raw_file:
+        raw_file.write(RAW_MAGIC)
+        raw_file.write(struct.pack("<II", captured.width, captured.height))
+        raw_file.write(to_display_bytes(scene, captured))
+
+
+def publish_frame(scene, captured: CapturedRender):
+    global frame_buffer_writer
+
+    if frame_buffer_writer is None:
+        slot_size = max([MIN_FRAME_BUFFER_SLOT_SIZE] + [other.width * other.height * 4 for other in captured_renders])
+        frame_buffer_writer = FrameBufferWriter.create(common.frame_buffer_path, slot_size)
+        print(f"Frame buffer: {common.frame_buffer_path}")
+
+    published_frames[captured.path] = frame_buffer_writer.publish(captured.mode.value, captured.width, captured.height, to_display_bytes(scene, captured))
+
+
+def write_captures():
+    published_frames.clear()
+    scene = bpy.data.scenes["Scene"]
+    if common.frame_buffer_path is not None:
+        try:
+            for captured in captured_renders:
+                publish_frame(scene, captured)
+        finally:
+            clear()
+        return
+
+    image_settings = scene.render.image_settings
+    compression: int = image_settings.compression
+    image_settings.compression = 0
+    try:
+        for captured in captured_renders:
+            if common.memory_output == "raw":
+                write_raw(scene, captured)
+            else:
+                write_png(scene, captured)
+    finally:
+        image_settings.compression = compression
+        clear()
+
+
+# Puts back the template's compositing the way it was before ensure_viewer_node
+def restore_compositing():
+    global template_compositing
+
+    if template_compositing is None:
+        return
+
+    scene = bpy.data.scenes["Scene"]
+    (use_nodes, use_compositing, active_name, added_nodes) = template_compositing
+    tree = scene.node_tree
+    if tree is not None:
+        for name in added_nodes:
+            node = tree.nodes.get(name)
+            if node is not None:
+                tree.nodes.remove(node)
+        if active_name is not None and tree.nodes.get(active_name) is not None:
+            tree.nodes.active = tree.nodes[active_name]
+    scene.render.use_compositing = use_compositing
+    scene.use_nodes = use_nodes
+    template_compositing = None
+
+
+def clear():
+    captured_renders.clear()
+    image = bpy.data.images.get(CAPTURE_IMAGE_NAME)
+    if image is not None:
+        bpy.data.images.remove(image)
+    restore_compositing()
@@ -0,0 +1,58 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import socket
+import sys
+from typing import List, Any
+
+"""
+Sends RenderJob JSON files to a running render_server.py and prints one JSON response per job.
+Runs with any Python 3 interpreter.
+
+Usage: python render_client.py <socket path> <job.json>...
+"""
+
+
+def request_renders(socket_path: str, job_lines: List[str]) -> List[dict[str, Any]]:
+    responses: List[dict[str, Any]] = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        with client.makefile("rwb") as stream:
+            for job_line in job_lines:
+                stream.write((job_line.strip() + "\n").encode())
+                stream.flush()
+                responses.append(json.loads(stream.readline()))
+
+    return responses
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python render_client.py <socket path> <job.json>...")
+        sys.exit(2)
+
+    lines: List[str] = []
+    for job_path in sys.argv[2:]:
+        with open(job_path, "r") as job_file:
+            lines.append(job_file.readline())
+
+    results = request_renders(sys.argv[1], lines)
+    for result in results:
+        print(json.dumps(result))
+    sys.exit(0 if all(result["status"] == "done" for result in results) else 1)
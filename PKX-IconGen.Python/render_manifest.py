@@ -0,0 +1,170 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Final, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import common
+import version
+from data.edit_mode import EditMode
+from data.render_job import RenderJob
+
+"""
+Fingerprints of rendered modes, kept in a sidecar file next to the outputs so unchanged modes can be skipped on the next render.
+A fingerprint covers everything a mode's output depends on: its RenderData, the model and custom texture files, the scale and the game.
+"""
+
+MANIFEST_NAME: Final[str] = ".pkx-render-manifest.json"
+LOCK_NAME: Final[str] = ".pkx-render-manifest.lock"  # Held while merging, pool workers can share an output folder
+
+# SHA-256 of files by (path, mtime_ns, size), models and textures are shared by most modes of a job
+file_hashes: dict[tuple[str, int, int], str] = {}
+
+
+def get_file_hash(path: str) -> str:
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in file_hashes:
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash.update(chunk)
+        file_hashes[key] = file_hash.hexdigest()
+
+    return file_hashes[key]
+
+
+def get_asset_path(path: str) -> str:
+    return common.get_absolute_asset_path(path) if common.assets_path is not None else path
+
+
+def get_mode_fingerprint(job: RenderJob, mode: EditMode) -> str:
+    prd = job.data
+    render_data = prd.get_mode_render(mode)
+
+    textures: dict[str, Optional[str]] = {}
+    for texture in render_data.textures:
+        textures[texture.name] = get_file_hash(get_asset_path(texture.path)) if texture.path is not None else None
+
+    state: dict[str, Any] = {
+        "version": version.addon_ver_str,
+        "mode": mode.name,
+        "game": job.game.name,
+        "scale": job.scale,
+        "render_data": json.loads(json.dumps(render_data, default=vars)),
+        "shiny_colors": json.loads(json.dumps([prd.shiny.color1, prd.shiny.color2], default=vars)),
+        "render_profile": json.loads(json.dumps(common.get_render_profile(job.render_profile), default=vars)),
+        "downsample_textures": common.downsample_textures,
+        "model": get_file_hash(get_asset_path(prd.get_mode_model(mode))),
+        "textures": textures
+    }
+
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()
+
+
+# Exclusive lock on the folder's manifest, waits for other processes holding it
+@contextmanager
+def lock_manifest(folder: str):
+    with open(os.path.join(folder, LOCK_NAME), "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_entries(manifest_path: str) -> dict[str, dict[str, Any]]:
+    if not os.path.isfile(manifest_path):
+        return {}
+
+    # noinspection PyBroadException
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+    except Exception:
+        print(f"Could not read render manifest, ignoring. [{manifest_path}]")
+        return {}
+
+
+class RenderManifest(object):
+
+    def __init__(self):
+        # Manifest content by output folder, output file name -> {"fingerprint", "mtime_ns", "size"}
+        self.folders: dict[str, dict[str, dict[str, Any]]] = {}
+        # Output file names updated by this job, by output folder
+        self.changed_entries: dict[str, set[str]] = {}
+
+    def get_folder_entries(self, folder: str) -> dict[str, dict[str, Any]]:
+        if folder not in self.folders:
+            self.folders[folder] = read_entries(os.path.join(folder, MANIFEST_NAME))
+
+        return self.folders[folder]
+
+    def is_up_to_date(self, output_path: str, fingerprint: str) -> bool:
+        folder, file_name = os.path.split(os.path.abspath(output_path))
+        entry = self.get_folder_entries(folder).get(file_name)
+        if entry is None or entry["fingerprint"] != fingerprint or not os.path.isfile(output_path):
+            return False
+
+        stat = os.stat(output_path)
+        return entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+
+    def update(self, output_path: str, fingerprint: str):
+        folder, file_name = os.path.split(os.path.abspath(output_path))
+        if not os.path.isfile(output_path):
+            return
+
+        stat = os.stat(output_path)
+        self.get_folder_entries(folder)[file_name] = {
+            "fingerprint": fingerprint,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size
+        }
+        self.changed_entries.setdefault(folder, set()).add(file_name)
+
+    # Only writes the entries updated by this job over what is on disk now, other processes may have written theirs since
+    def save(self):
+        for (folder, file_names) in self.changed_entries.items():
+            manifest_path = os.path.join(folder, MANIFEST_NAME)
+            temp_path = os.path.join(folder, f".{os.getpid()}-{MANIFEST_NAME}")
+            with lock_manifest(folder):
+                entries = read_entries(manifest_path)
+                for file_name in file_names:
+                    entries[file_name] = self.folders[folder][file_name]
+                with open(temp_path, "w") as manifest_file:
+                    json.dump(entries, manifest_file, indent=2)
+                os.replace(temp_path, manifest_path)  # A crash while writing never leaves a partial manifest
+            self.folders[folder] = entries
+        self.changed_entries.clear()
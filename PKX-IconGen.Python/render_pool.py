@@ -0,0 +1,330 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import getopt
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Optional, List, Final, Any
+
+"""
+Splits RenderJob JSON files across several Blender processes running render.py in worker mode.
+Runs with any Python 3.9+ interpreter, Blender is only used for the workers.
+
+Usage: python render_pool.py --blender <blender executable> [--workers N] [--threads N] [--template <.blend>] [--assets-path <path>] [--render-profile <preset>] [--model-cache <folder>] [--profile <folder>] [--memory-profile] [--incremental] [--job-timeout <seconds>] [--verbose] <job.json>...
+"""
+
+PYTHON_FOLDER: Final[str] = os.path.dirname(os.path.abspath(__file__))
+RECORD_KEY: Final[str] = "pkx_record"  # See common.emit_record
+MAX_JOB_ATTEMPTS: Final[int] = 2
+MAX_WORKER_RESTARTS: Final[int] = 3
+STREAM_LIMIT: Final[int] = 2 ** 20
+DEFAULT_JOB_TIMEOUT: Final[float] = 1800  # Seconds without a job record before a worker is considered hung
+
+
+class PendingJob(object):
+
+    def __init__(self, path: str, json_line: str):
+        self.path = path
+        self.json_line = json_line
+        self.attempts = 0
+
+
+class PoolOptions(object):
+
+    def __init__(self, blender_path: str, template_path: str, workers: int, threads: int, assets_path: Optional[str], render_profile: Optional[str], model_cache_path: Optional[str],
+                 profile_path: Optional[str], memory_profiling: bool, incremental: bool, job_timeout: float, verbose: bool):
+        self.blender_path = blender_path
+        self.template_path = template_path
+        self.workers = workers
+        self.threads = threads
+        self.assets_path = assets_path
+        self.render_profile = render_profile
+        self.model_cache_path = model_cache_path  # Shared by every worker
+        self.profile_path = profile_path  # Shared by every worker, file names hold the worker PID
+        self.memory_profiling = memory_profiling
+        self.incremental = incremental
+        self.job_timeout = job_timeout
+        self.verbose = verbose
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def read_job_line(job_path: str) -> str:
+    with open(job_path, "r") as job_file:
+        # Same as render.py, a job is a single line of JSON
+        return job_file.readline().strip()
+
+
+def parse_record(line: str) -> Optional[dict[str, Any]]:
+    if not line.startswith("{"):
+        return None
+
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+    return record if isinstance(record, dict) and RECORD_KEY in record else None
+
+
+def get_default_threads(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+class BlenderWorker(object):
+
+    def __init__(self, worker_id: int, options: PoolOptions, blend_path: str):
+        self.worker_id = worker_id
+        self.options = options
+        self.blend_path = blend_path
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.stderr_task: Optional[asyncio.Task] = None
+
+    def log(self, msg: str):
+        print(f"[Worker {self.worker_id}] {msg}", flush=True)
+
+    async def start(self):
+        # Each worker gets its own copy of the template, the worker may import models into it
+        try:
+            shutil.copyfile(self.options.template_path, self.blend_path)
+        except OSError as e:
+            raise WorkerDied(f"Could not copy the template: {e}")
+
+        args: List[str] = [
+            "--background",
+            "--enable-autoexec",
+            "--python-exit-code", "200",
+            "--threads", str(self.options.threads),
+            self.blend_path,
+            "--python", os.path.join(PYTHON_FOLDER, "render.py"),
+            "--",
+            "--worker"
+        ]
+        if self.options.assets_path is not None:
+            args.extend(["--assets-path", self.options.assets_path])
+        if self.options.render_profile is not None:
+            args.extend(["--render-profile", self.options.render_profile])
+        if self.options.model_cache_path is not None:
+            args.extend(["--model-cache", self.options.model_cache_path])
+        if self.options.profile_path is not None:
+            args.extend(["--profile", self.options.profile_path])
+        if self.options.memory_profiling:
+            args.append("--memory-profile")
+        if self.options.incremental:
+            args.append("--incremental")
+        if self.options.verbose:
+            args.append("--verbose")
+
+        # A missing Blender or running out of file descriptors is handled like a crash
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.options.blender_path, *args,
+                cwd=PYTHON_FOLDER,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=STREAM_LIMIT
+            )
+        except OSError as e:
+            raise WorkerDied(f"Could not start Blender: {e}")
+        self.stderr_task = asyncio.create_task(self.drain_stderr())
+        self.log(f"Started, PID {self.process.pid}, {self.options.threads} threads")
+
+    async def drain_stderr(self):
+        # Never leave stderr unread, a full pipe would block Blender
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                break
+            if self.options.verbose:
+                self.log(f"Err> {line.decode(errors='replace').rstrip()}")
+
+    async def render(self, job: PendingJob) -> dict[str, Any]:
+        try:
+            self.process.stdin.write((job.json_line + "\n").encode())
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise WorkerDied(str(e))
+
+        # A hung worker or an unreadable output is handled like a dead worker: killed, then the job is retried
+        try:
+            return await asyncio.wait_for(self.read_job_record(), timeout=self.options.job_timeout)
+        except asyncio.TimeoutError:
+            raise WorkerDied(f"No result after {self.options.job_timeout:g} seconds")
+        except (ValueError, asyncio.LimitOverrunError, asyncio.IncompleteReadError) as e:
+            raise WorkerDied(f"Unreadable output: {e}")
+
+    async def read_job_record(self) -> dict[str, Any]:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise WorkerDied(f"Exited with code {await self.process.wait()}")
+
+            text = line.decode(errors="replace").rstrip()
+            record = parse_record(text)
+            if record is not None and record[RECORD_KEY] == "job":
+                return record
+            elif self.options.verbose or (record is not None and record[RECORD_KEY] == "memory"):
+                self.log(f"Out> {text}")
+
+    async def stop(self):
+        if self.process is None:
+            return
+
+        if self.process.returncode is None:
+            self.process.stdin.close()
+            await self.process.wait()
+        if self.stderr_task is not None:
+            await self.stderr_task
+
+        self.process = None
+        self.stderr_task = None
+
+    async def kill(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+        await self.stop()
+
+
+async def run_worker(worker: BlenderWorker, queue: asyncio.Queue, results: List[dict[str, Any]]):
+    starts: int = 0
+    while True:
+        try:
+            job: PendingJob = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+
+        if worker.process is None:
+            if starts > MAX_WORKER_RESTARTS:
+                worker.log("Too many restarts, giving up on this worker")
+                queue.put_nowait(job)
+                return
+
+            starts += 1
+            try:
+                await worker.start()
+            except WorkerDied as e:
+                worker.log(f"Failed to start: {e}")
+                queue.put_nowait(job)  # Never sent to Blender, the attempt does not count
+                continue
+
+        job.attempts += 1
+        try:
+            record = await worker.render(job)
+            record["job"] = job.path
+            results.append(record)
+            worker.log(f"{record['status']}: {job.path}")
+        except WorkerDied as e:
+            worker.log(f"Died while rendering {job.path}: {e}")
+            await worker.kill()
+
+            if job.attempts < MAX_JOB_ATTEMPTS:
+                queue.put_nowait(job)
+            else:
+                results.append({RECORD_KEY: "job", "status": "failed", "job": job.path, "error": str(e)})
+
+    await worker.stop()
+
+
+async def run_pool(job_paths: List[str], options: PoolOptions) -> List[dict[str, Any]]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for job_path in job_paths:
+        queue.put_nowait(PendingJob(job_path, read_job_line(job_path)))
+
+    results: List[dict[str, Any]] = []
+    worker_count = min(options.workers, len(job_paths))
+    with tempfile.TemporaryDirectory(prefix="pkx-render-pool-") as blend_folder:
+        workers = [BlenderWorker(i, options, os.path.join(blend_folder, f"worker_{i}.blend")) for i in range(worker_count)]
+        try:
+            await asyncio.gather(*[run_worker(worker, queue, results) for worker in workers])
+        finally:
+            for worker in workers:
+                await worker.kill()
+
+    # Jobs left behind by workers that gave up
+    while not queue.empty():
+        job: PendingJob = queue.get_nowait()
+        results.append({RECORD_KEY: "job", "status": "failed", "job": job.path, "error": "No worker left to render the job"})
+
+    return results
+
+
+if __name__ == "__main__":
+    blender_path: Optional[str] = None
+    template_path: str = os.path.join(PYTHON_FOLDER, "template.blend")
+    workers: int = max(1, (os.cpu_count() or 1) // 4)
+    threads: Optional[int] = None
+    assets_path: Optional[str] = None
+    render_profile: Optional[str] = None
+    model_cache_path: Optional[str] = None
+    profile_path: Optional[str] = None
+    memory_profiling: bool = False
+    incremental: bool = False
+    job_timeout: float = DEFAULT_JOB_TIMEOUT
+    verbose: bool = False
+
+    opts, job_paths = getopt.getopt(sys.argv[1:], "", ["blender=", "template=", "workers=", "threads=", "assets-path=", "render-profile=", "model-cache=", "profile=", "memory-profile", "incremental", "job-timeout=", "verbose"])
+    for arg, value in opts:
+        if arg == "--blender":
+            # Workers run from this folder, relative paths would not resolve anymore
+            blender_path = os.path.abspath(value) if os.path.exists(value) else value
+        elif arg == "--template":
+            template_path = value
+        elif arg == "--workers":
+            workers = max(1, int(value))
+        elif arg == "--threads":
+            threads = max(1, int(value))
+        elif arg == "--assets-path":
+            assets_path = os.path.abspath(value)
+        elif arg == "--render-profile":
+            render_profile = value
+        elif arg == "--model-cache":
+            model_cache_path = os.path.abspath(value)
+        elif arg == "--profile":
+            profile_path = os.path.abspath(value)
+        elif arg == "--memory-profile":
+            memory_profiling = True
+        elif arg == "--incremental":
+            incremental = True
+        elif arg == "--job-timeout":
+            job_timeout = float(value)
+        elif arg == "--verbose":
+            verbose = True
+
+    if blender_path is None:
+        print("No Blender executable provided, use --blender <path>.")
+        sys.exit(2)
+    if len(job_paths) == 0:
+        print("No job provided.")
+        sys.exit(2)
+
+    pool_options = PoolOptions(blender_path, template_path, workers, threads or get_default_threads(workers), assets_path, render_profile, model_cache_path,
+                               profile_path, memory_profiling, incremental, job_timeout, verbose)
+    pool_results = asyncio.run(run_pool(job_paths, pool_options))
+
+    failed = [result for result in pool_results if result["status"] != "done"]
+    print(f"Rendered {len(pool_results) - len(failed)}/{len(pool_results)} jobs")
+    for result in failed:
+        print(f"Failed: {result['job']}: {result.get('error')}")
+    sys.exit(1 if len(failed) > 0 else 0)
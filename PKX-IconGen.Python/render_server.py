@@ -0,0 +1,119 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import json
+import socket
+import socketserver
+import stat
+import sys
+import os
+import time
+import traceback
+from typing import Optional, Any
+
+sys.path.append(os.getcwd())
+
+from data.render_job import RenderJob
+
+import common
+import metrics
+import render
+
+"""
+Keeps a Blender process with the template scene loaded and renders RenderJobs sent over a Unix domain socket.
+Each request is a single line of RenderJob JSON, each response a single line of JSON:
+{"status": "done"|"failed", "name": str, "outputs": {mode: path}, "timings": {span: seconds}, "error": str}
+Requests are rendered one at a time, in the order they arrive. Models stay loaded until a request needs other ones.
+
+Usage: blender --background template.blend --python render_server.py -- --socket <path> [--assets-path <path>]
+"""
+
+
+def handle_request(request: str) -> dict[str, Any]:
+    start = time.perf_counter()
+    response: dict[str, Any] = {"status": "failed", "name": None, "outputs": {}, "timings": {}, "error": None}
+
+    job: Optional[RenderJob] = None
+    # noinspection PyBroadException
+    try:
+        common.print_verbose(f"Rendering: {request}")
+        with metrics.span("json_decode"):
+            job = RenderJob.from_json(request)
+        response["name"] = job.data.output_name or job.data.name
+
+        response["outputs"] = render.render_job(job, save_blend=False, timings=response["timings"])
+        response["status"] = "done"
+    except Exception as e:
+        traceback.print_exc()
+        response["error"] = str(e)
+        if job is None:
+            # render_job never runs, the spans so far are ended here
+            response["timings"].update(metrics.finish_job().spans)
+
+    response["timings"]["total"] = time.perf_counter() - start
+    return response
+
+
+class RenderRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        # A connection can send several jobs, one per line
+        for line in self.rfile:
+            request = line.decode()
+            if request.strip() == "":
+                continue
+
+            response = handle_request(request)
+            self.wfile.write((json.dumps(response, separators=(',', ':')) + "\n").encode())
+            self.wfile.flush()
+
+
+def serve(socket_path: str):
+    if not hasattr(socket, "AF_UNIX"):
+        raise Exception("Unix domain sockets are not supported on this platform.")
+
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise Exception(f"{socket_path} exists and is not a socket.")
+        os.remove(socket_path)  # Left behind by a server that did not shut down cleanly
+
+    # Not threaded, bpy must only be used from the main thread
+    with socketserver.UnixStreamServer(socket_path, RenderRequestHandler) as server:
+        print(f"Listening on {socket_path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    server_socket_path: Optional[str] = None
+
+    common.parse_cmd_args(sys.argv[sys.argv.index("--") + 1:])
+    for arg, value in common.cmd_args:
+        if arg == "--socket":
+            server_socket_path = value
+        elif arg == "--debug-egg":
+            common.attach_debugger(value)
+
+    if server_socket_path is None:
+        raise Exception("No socket path provided, use --socket <path>.")
+
+    serve(server_socket_path)
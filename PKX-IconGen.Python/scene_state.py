@@ -0,0 +1,172 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import copy
+import json
+import math
+from typing import Optional, Any, List
+
+import common
+import visibility
+from data.edit_mode import EditMode
+from data.object_shading import ObjectShading
+from data.shiny_color import ShinyColor
+from data.shiny_info import ShinyInfo
+from data.texture import Texture
+
+"""
+Last state applied to the scene, so switching between modes only applies what differs.
+Cheap values (camera, light, active action) are compared against the scene itself.
+Expensive ones (frame, hidden objects, textures and maps, shading, shiny switch and colors) are compared against what was
+last applied through here: anything changing them some other way must go through here too, or invalidate them.
+Hidden objects are tracked by the visibility manager.
+"""
+
+
+def is_same_value(value: Any, other: Any) -> bool:
+    if isinstance(value, str) or isinstance(other, str):
+        return value == other
+    if hasattr(value, "__len__"):
+        return len(value) == len(other) and all(is_same_value(v, o) for (v, o) in zip(value, other))
+    # Blender stores most floats as 32-bit
+    return math.isclose(value, other, rel_tol=1e-6, abs_tol=1e-6)
+
+
+def set_if_changed(struct, prop: str, value: Any):
+    if not is_same_value(getattr(struct, prop), value):
+        setattr(struct, prop, value)
+
+
+def get_textures_key(textures: List[Texture], render_scale: Optional[int] = None) -> str:
+    return json.dumps([textures, render_scale], default=vars, sort_keys=True)
+
+
+class SceneState(object):
+
+    def __init__(self):
+        self.shiny: Optional[bool] = None
+        self.armature_name: Optional[str] = None
+        self.frame: Optional[int] = None
+        self.animation_changed: bool = False
+        self.textures: List[Texture] = []  # Copies, what to reset
+        self.textures_key: Optional[str] = None
+        self.shading: Optional[ObjectShading] = None
+        self.shiny_colors: Optional[str] = None
+
+    def switch_model(self, shiny_info: ShinyInfo, mode: EditMode):
+        shiny = mode in EditMode.ANY_SHINY
+        if shiny == self.shiny:
+            return
+
+        common.switch_model(shiny_info, mode)
+        self.shiny = shiny
+
+    # noinspection PyMethodMayBeStatic
+    def set_camera(self, camera_obj, focus_obj, pos, focus, is_ortho: bool, angle: float, ortho_scale: float):
+        set_if_changed(camera_obj, "location", pos)
+        set_if_changed(focus_obj, "location", focus)
+        set_if_changed(camera_obj.data, "type", "ORTHO" if is_ortho else "PERSP")
+        set_if_changed(camera_obj.data, "angle", angle)
+        set_if_changed(camera_obj.data, "ortho_scale", ortho_scale)
+
+    # noinspection PyMethodMayBeStatic
+    def set_light(self, light_obj, light_type: str, energy: float, color, distance: float):
+        set_if_changed(light_obj.data, "type", light_type)
+        set_if_changed(light_obj.data, "energy", energy)
+        set_if_changed(light_obj.data, "color", color)
+        if not is_same_value(light_obj.location[2], distance):
+            light_obj.location[2] = distance
+
+    def set_action(self, armature_obj, action):
+        if armature_obj.animation_data.action != action:
+            armature_obj.animation_data.action = action
+            self.animation_changed = True
+        if armature_obj.name != self.armature_name:
+            self.armature_name = armature_obj.name
+            self.animation_changed = True
+
+    # Re-evaluates the whole scene, only when the frame or the animation changed
+    def set_frame(self, scene, frame: int):
+        if self.animation_changed or self.frame != frame or scene.frame_current != frame:
+            scene.frame_set(frame)
+            self.frame = frame
+            self.animation_changed = False
+
+    # noinspection PyMethodMayBeStatic
+    def set_hidden_objects(self, hidden_objects: List[str]):
+        visibility.manager.set_removed_objects(hidden_objects)
+
+    def set_textures(self, textures: List[Texture], render_scale: Optional[int] = None):
+        if get_textures_key(textures, render_scale) == self.textures_key:
+            return
+
+        self.reset_textures()
+        common.set_textures(textures, render_scale)
+        self.record_textures(textures, render_scale)
+
+    # Textures were applied some other way, they are what will be reset on the next change
+    def record_textures(self, textures: List[Texture], render_scale: Optional[int] = None):
+        self.textures = copy.deepcopy(textures)
+        self.textures_key = get_textures_key(textures, render_scale)
+
+    def reset_textures(self):
+        for texture in self.textures:
+            common.reset_texture_images(texture)
+        common.reset_materials_maps()
+        self.textures = []
+        self.textures_key = None
+
+    def set_shading(self, shading: ObjectShading):
+        if shading != self.shading:
+            common.update_shading(shading)
+            self.shading = shading
+
+    def set_shiny_colors(self, color1: ShinyColor, color2: ShinyColor):
+        shiny_colors = json.dumps([color1, color2], default=vars, sort_keys=True)
+        if shiny_colors != self.shiny_colors:
+            common.update_all_shiny_colors(color1, color2)
+            self.shiny_colors = shiny_colors
+
+    def invalidate_shiny_colors(self):
+        self.shiny_colors = None
+
+    # Shiny switch and visibility were keyed, re-evaluating the scene can put back other values
+    def invalidate_keyed(self):
+        self.shiny = None
+        visibility.manager.invalidate()
+
+    # Values were changed some other way, like keyframes, apply them all again on the next changes
+    def invalidate(self):
+        self.shiny = None
+        self.frame = None
+        self.shading = None
+        self.shiny_colors = None
+        visibility.manager.invalidate()
+
+    # Puts back textures and hidden objects, then forgets everything
+    def reset(self):
+        self.reset_textures()
+        visibility.manager.reset()
+        self.clear()
+
+    # Forgets everything without touching the scene, the next changes are all applied
+    def clear(self):
+        self.__init__()
+
+
+current: SceneState = SceneState()
@@ -0,0 +1,212 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+from typing import Final, Optional, Any
+
+import bpy
+import numpy as np
+
+"""
+Custom texture images by absolute path, loaded once and reloaded only when the file changes on disk.
+Images bound to original images are referenced, images nothing references are removed from the oldest once the loaded
+custom images go over the budget.
+Downsampled copies are cached next to them with their factor: each block of factor x factor texels is averaged (box filter).
+"""
+
+DEFAULT_BUDGET_MB: Final[int] = 512
+
+
+def get_image_bytes(image) -> int:
+    if not image.has_data:
+        return 0
+    return image.size[0] * image.size[1] * image.channels * (4 if image.is_float else 1)
+
+
+def get_key(path: str, factor: int) -> str:
+    return path if factor == 1 else f"{path}@{factor}"
+
+
+# Largest factor keeping the custom texture an integer multiple of the original, at least render_scale times its size
+def get_downsample_factor(original_size: tuple[int, int], custom_size: tuple[int, int], render_scale: int) -> int:
+    if original_size[0] == 0 or custom_size[0] % original_size[0] != 0:
+        return 1
+
+    multiple: int = custom_size[0] // original_size[0]
+    factor: int = max(1, multiple // max(1, render_scale))
+    while multiple % factor != 0:
+        factor -= 1
+    return factor
+
+
+def srgb_to_linear(values: np.ndarray) -> np.ndarray:
+    return np.where(values <= 0.04045, values / 12.92, np.power((np.maximum(values, 0.0) + 0.055) / 1.055, 2.4))
+
+
+def linear_to_srgb(values: np.ndarray) -> np.ndarray:
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * np.power(np.maximum(values, 0.0), 1 / 2.4) - 0.055)
+
+
+# Averages alpha weighted colors so transparent texels don't bleed into the edges, in linear space for sRGB pixels
+def box_filter(pixels: np.ndarray, width: int, height: int, factor: int, srgb: bool, premultiplied: bool) -> np.ndarray:
+    blocks = pixels.reshape((height // factor, factor, width // factor, factor, 4))
+    rgb = blocks[..., :3]
+    alpha = blocks[..., 3:]
+    if srgb:
+        rgb = srgb_to_linear(rgb)
+    if not premultiplied:
+        rgb = rgb * alpha
+
+    mean_rgb = rgb.mean(axis=(1, 3), dtype=np.float32)
+    mean_alpha = alpha.mean(axis=(1, 3), dtype=np.float32)
+    if not premultiplied:
+        mean_rgb = np.divide(mean_rgb, mean_alpha, out=np.zeros_like(mean_rgb), where=mean_alpha > 0)
+    if srgb:
+        mean_rgb = linear_to_srgb(mean_rgb)
+    return np.concatenate((mean_rgb, mean_alpha), axis=-1).astype(np.float32).ravel()
+
+
+# Writes the downsampled pixels of source into image, or a new image when None
+def downsample(source, factor: int, image=None):
+    width, height = source.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    source.pixels.foreach_get(pixels)
+
+    new_width: int = width // factor
+    new_height: int = height // factor
+    if image is None:
+        image = bpy.data.images.new(f"{source.name}@{factor}", new_width, new_height, alpha=True, float_buffer=source.is_float)
+        image.colorspace_settings.name = source.colorspace_settings.name
+        image.alpha_mode = source.alpha_mode
+    elif tuple(image.size) != (new_width, new_height):
+        image.scale(new_width, new_height)
+
+    # Float buffers hold linear premultiplied pixels, byte buffers hold them in the image's color space
+    srgb: bool = not source.is_float and source.colorspace_settings.name == "sRGB"
+    premultiplied: bool = source.is_float or source.alpha_mode == "PREMUL"
+    image.pixels.foreach_set(box_filter(pixels, width, height, factor, srgb, premultiplied))
+    image.update()
+    return image
+
+
+class CachedImage(object):
+
+    def __init__(self, path: str, factor: int, mtime: float, image):
+        self.path = path
+        self.factor = factor
+        self.mtime = mtime
+        self.image = image
+        self.refs: int = 0
+
+
+class TextureCache(object):
+
+    def __init__(self):
+        # By absolute path and downsample factor, least recently used first
+        self.entries: dict[str, CachedImage] = {}
+        self.budget_bytes: int = DEFAULT_BUDGET_MB * 1024 * 1024
+
+    # Loaded image of the path or None, does not load or reload it
+    def find(self, path: str, factor: int = 1) -> Optional[Any]:
+        key = get_key(path, factor)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        try:
+            _ = entry.image.name
+        except ReferenceError:  # Removed some other way
+            del self.entries[key]
+            return None
+        return entry.image
+
+    # Loaded image of the path, loaded or reloaded first if needed, without referencing it
+    def get(self, path: str, factor: int = 1):
+        key = get_key(path, factor)
+        mtime = os.path.getmtime(path)
+        image = self.find(path, factor)
+        if image is None:
+            image = self.load(path, factor)
+            self.entries[key] = CachedImage(path, factor, mtime, image)
+        else:
+            entry = self.entries.pop(key)
+            if entry.mtime != mtime:
+                print(f"Custom texture changed on disk, reloading. [{path}]")
+                self.reload(path, factor, image)
+                entry.mtime = mtime
+            self.entries[key] = entry
+        return image
+
+    def load(self, path: str, factor: int):
+        if factor == 1:
+            return bpy.data.images.load(filepath=path, check_existing=True)
+
+        source = self.get(path)
+        image = downsample(source, factor)
+        self.discard(path)  # Keeps the full resolution image only while something uses it
+        return image
+
+    def reload(self, path: str, factor: int, image):
+        if factor == 1:
+            image.reload()
+            return
+
+        downsample(self.get(path), factor, image)
+        self.discard(path)
+
+    def acquire(self, path: str, factor: int = 1):
+        image = self.get(path, factor)
+        self.entries[get_key(path, factor)].refs += 1
+        self.evict()
+        return image
+
+    def release(self, path: str, factor: int = 1):
+        entry = self.entries.get(get_key(path, factor))
+        if entry is not None and entry.refs > 0:
+            entry.refs -= 1
+
+    # Removes the image now if nothing references it
+    def discard(self, path: str, factor: int = 1):
+        image = self.find(path, factor)
+        key = get_key(path, factor)
+        if image is not None and self.entries[key].refs == 0:
+            bpy.data.images.remove(image)
+            del self.entries[key]
+
+    def evict(self):
+        sizes: dict[str, int] = {key: get_image_bytes(self.entries[key].image) for key in list(self.entries.keys()) if self.find(self.entries[key].path, self.entries[key].factor) is not None}
+        total: int = sum(sizes.values())
+        for key in list(sizes.keys()):
+            if total <= self.budget_bytes:
+                break
+            entry = self.entries[key]
+            if entry.refs == 0:
+                print(f"Removing unused custom texture. [{key}]")
+                bpy.data.images.remove(entry.image)
+                del self.entries[key]
+                total -= sizes[key]
+
+    # Removes every loaded image, referenced or not
+    def remove_all(self):
+        images = [self.find(entry.path, entry.factor) for entry in list(self.entries.values())]
+        removed_images = [image for image in images if image is not None]
+        if len(removed_images) > 0:
+            bpy.data.batch_remove(ids=removed_images)
+        self.entries.clear()
+
+
+current: TextureCache = TextureCache()
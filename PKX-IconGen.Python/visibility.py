@@ -0,0 +1,105 @@
+""" License
+    PKX-IconGen.Python - Python code for PKX-IconGen to interact with Blender
+    Copyright (C) 2021-2026 Samuel Caron/mikeyX#4697
+
+    This program is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import Optional, Any, List
+
+import bpy
+
+"""
+Objects removed by the current mode, hidden and shown again by set difference when the mode changes.
+Objects are found through a name index instead of searching bpy.data.objects for each name.
+"""
+
+
+class VisibilityManager(object):
+
+    def __init__(self):
+        self.objects_by_name: dict[str, Any] = {}
+        self.hidden_objects: set[str] = set()  # Hidden through here and still hidden
+        self.possibly_hidden_objects: set[str] = set()  # Everything hidden through here since the last reset
+        self.stale: bool = False  # Visibility was changed some other way, apply it all again
+
+    def get_object(self, name: str) -> Optional[Any]:
+        obj = self.objects_by_name.get(name)
+        if obj is not None:
+            try:
+                if obj.name == name:
+                    return obj
+            except ReferenceError:  # Removed since the index was built
+                pass
+        elif len(self.objects_by_name) == len(bpy.data.objects):
+            return None
+
+        self.objects_by_name = {obj.name: obj for obj in bpy.data.objects}
+        return self.objects_by_name.get(name)
+
+    def is_parent_shown(self, name: str) -> bool:
+        obj = self.get_object(name)
+        return obj is None or obj.parent is None or not obj.parent.hide_render
+
+    def show(self, names: List[str]):
+        for name in names:
+            obj = self.get_object(name)
+            if obj is not None:
+                obj.hide_render = False
+                obj.hide_viewport = False
+
+    def hide(self, names: List[str]):
+        for name in names:
+            obj = self.get_object(name)
+            if obj is None:
+                print("Removed object not found, ignoring. [%s]" % name)
+                continue
+            obj.hide_render = True
+            obj.hide_viewport = True
+
+    def set_removed_objects(self, removed_objects: List[str]):
+        target = set(removed_objects)
+        shown_objects = self.possibly_hidden_objects if self.stale else self.hidden_objects
+        # Children of a hidden armature stay hidden, showing the armature shows them
+        self.show([name for name in shown_objects if name not in target and self.is_parent_shown(name)])
+        self.hide([name for name in removed_objects if self.stale or name not in self.hidden_objects])
+
+        self.hidden_objects = target
+        self.possibly_hidden_objects.update(target)
+        self.stale = False
+
+    # Called when an armature and its children are shown or hidden all at once
+    def armature_shown(self, armature_obj, show: bool):
+        if show:
+            self.hidden_objects.difference_update([child.name for child in armature_obj.children])
+
+    def invalidate(self):
+        self.stale = True
+
+    # Shows everything hidden through here, then forgets it
+    def reset(self):
+        self.show(list(self.possibly_hidden_objects))
+        self.hidden_objects.clear()
+        self.possibly_hidden_objects.clear()
+        self.stale = False
+
+    # Forgets everything without touching the scene, after objects were removed
+    def clear(self):
+        self.objects_by_name.clear()
+        self.hidden_objects.clear()
+        self.possibly_hidden_objects.clear()
+        self.stale = False
+
+
+manager: VisibilityManager = VisibilityManager()